@@ -3,17 +3,21 @@ from flask_sqlalchemy import SQLAlchemy
 import os
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
 def create_app():
+    """Build the Flask app without touching the database.
+
+    Creating tables and seeding caregivers and the weekly template are done
+    once per deploy with `flask init-db` (see cli.py), not on every boot.
+    """
+    # Levels and format come from LOG_LEVEL, LOG_LEVELS and LOG_FORMAT
+    from .logging_config import configure_logging
+    configure_logging()
+
     try:
         logger.debug("Starting application creation...")
         app = Flask(__name__)
@@ -25,32 +29,18 @@ def create_app():
         # Initialize database
         db.init_app(app)
         
-        # Import models here to avoid circular imports
-        from .models import Caregiver, Shift
+        # Request timing, SQL counting and /metrics
+        from .instrumentation import init_instrumentation
+        init_instrumentation(app)
         
-        with app.app_context():
-            logger.debug("Creating database tables...")
-            db.create_all()
-            
-            # Initialize caregivers if none exist
-            if Caregiver.query.count() == 0:
-                logger.debug("Initializing caregivers...")
-                from .config import ShiftConfig
-                for name in ShiftConfig.CAREGIVERS:
-                    caregiver = Caregiver(name=name)
-                    db.session.add(caregiver)
-                db.session.commit()
-                logger.debug(f"Added {len(ShiftConfig.CAREGIVERS)} caregivers")
-        
-        # Register blueprints
+        # Register blueprints and CLI commands
         from .routes import views
         app.register_blueprint(views)
+        from .cli import register_commands
+        register_commands(app)
         
         logger.debug("Application creation completed successfully")
         return app
     except Exception as e:
-        logger.error(f"Error creating application: {str(e)}")
+        logger.error("Error creating application: %s", e)
         raise
-
-# Create the application instance
-app = create_app() 
\ No newline at end of file
@@ -0,0 +1,98 @@
+from .models import db, Caregiver, TimeOff
+from bisect import bisect_right
+from collections import defaultdict
+
+_EMPTY = frozenset()
+
+class AvailabilityIndex:
+    """Approved time off as sorted, merged date intervals per caregiver.
+
+    "Is X off on D" is a bisect over X's intervals and "who is off on D" a
+    bisect over the precomputed change points of the whole index, so both
+    are O(log n) no matter how long the leaves or the history are. Build it
+    with build() for a window (one query) and pass it to whatever needs
+    time off for that window.
+    """
+    def __init__(self, intervals=None, names=None):
+        self.names = names or {}  # caregiver_id -> name
+        self.ids = {name: cid for cid, name in self.names.items()}
+        self._starts = {}  # caregiver_id -> [start ordinal]
+        self._ends = {}  # caregiver_id -> [end ordinal], inclusive
+        for caregiver_id, ranges in (intervals or {}).items():
+            self._add_ranges(caregiver_id, ranges)
+        self._index_change_points()
+
+    @classmethod
+    def build(cls, start_date=None, end_date=None, status='approved'):
+        """Load the time off overlapping [start_date, end_date] with one query"""
+        query = db.session.query(TimeOff.caregiver_id, TimeOff.start_date, TimeOff.end_date, Caregiver.name).join(
+            Caregiver, TimeOff.caregiver_id == Caregiver.id
+        )
+        if status is not None:
+            query = query.filter(TimeOff.status == status)
+        if end_date is not None:
+            query = query.filter(TimeOff.start_date <= end_date)
+        if start_date is not None:
+            query = query.filter(TimeOff.end_date >= start_date)
+
+        intervals = defaultdict(list)
+        names = {}
+        for caregiver_id, record_start, record_end, name in query.all():
+            intervals[caregiver_id].append((record_start, record_end))
+            names[caregiver_id] = name
+        return cls(intervals, names)
+
+    @classmethod
+    def from_dates(cls, dates_by_caregiver):
+        """Index from {caregiver_id: iterable of dates}"""
+        return cls({cid: [(d, d) for d in dates] for cid, dates in dates_by_caregiver.items()})
+
+    def _add_ranges(self, caregiver_id, ranges):
+        # Sort and merge overlapping or touching ranges
+        merged = []
+        for start, end in sorted((s.toordinal(), e.toordinal()) for s, e in ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        if merged:
+            self._starts[caregiver_id] = [start for start, _ in merged]
+            self._ends[caregiver_id] = [end for _, end in merged]
+
+    def _index_change_points(self):
+        # Sweep every interval boundary once; each point stores who is off from there on
+        events = defaultdict(list)
+        for caregiver_id, starts in self._starts.items():
+            for start, end in zip(starts, self._ends[caregiver_id]):
+                events[start].append((caregiver_id, True))
+                events[end + 1].append((caregiver_id, False))
+        self._points = sorted(events)
+        self._off_sets = []
+        off = set()
+        for point in self._points:
+            for caregiver_id, starts_off in events[point]:
+                if starts_off:
+                    off.add(caregiver_id)
+                else:
+                    off.discard(caregiver_id)
+            self._off_sets.append(frozenset(off))
+
+    def is_off(self, caregiver_id, date):
+        starts = self._starts.get(caregiver_id)
+        if not starts:
+            return False
+        day = date.toordinal()
+        i = bisect_right(starts, day) - 1
+        return i >= 0 and self._ends[caregiver_id][i] >= day
+
+    def is_name_off(self, name, date):
+        caregiver_id = self.ids.get(name)
+        return caregiver_id is not None and self.is_off(caregiver_id, date)
+
+    def off_on(self, date):
+        """Ids of the caregivers off on date"""
+        i = bisect_right(self._points, date.toordinal()) - 1
+        return self._off_sets[i] if i >= 0 else _EMPTY
+
+    def names_off_on(self, date):
+        return sorted(self.names.get(cid, str(cid)) for cid in self.off_on(date))
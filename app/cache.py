@@ -0,0 +1,215 @@
+"""Response cache for the read-heavy schedule views.
+
+Entries are keyed by view, full request path, today's date (views default
+to windows relative to today) and the schedule version: a database counter
+that every schedule write bumps in the same transaction. A write makes all
+older entries unreachable at once, in every worker, so there is nothing to
+invalidate by hand; stale entries age out of the LRU or hit their TTL.
+
+The same key gives the page's ETag, so a browser revalidating an unchanged
+page gets a 304 without the view running at all. Clients that only send
+If-Modified-Since (many calendar apps) are answered from the time of the
+last schedule write.
+"""
+from .models import db, ScheduleVersion
+from collections import OrderedDict
+from flask import current_app, request, session, make_response
+from functools import wraps
+import hashlib
+import logging
+import pickle
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL"""
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class RedisCache:
+    """Same interface on a Redis server shared by every worker.
+
+    Needs the optional redis package. The client only connects on first
+    use, so an unreachable server shows up in get/set: those count as a
+    miss and a no-op, and the outage is logged once rather than failing
+    every cached page.
+    """
+    def __init__(self, url, ttl=300, prefix='ghs:view:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.errors = redis.RedisError
+        self.failing = False
+
+    def _failed(self, e):
+        if not self.failing:
+            self.failing = True
+            logger.error("Shared cache unreachable, serving pages uncached: %s", e)
+
+    def _reached(self):
+        if self.failing:
+            self.failing = False
+            logger.info("Shared cache reachable again")
+
+    def get(self, key):
+        try:
+            value = self.client.get(self.prefix + key)
+        except self.errors as e:
+            self._failed(e)
+            return None
+        self._reached()
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+        except self.errors as e:
+            self._failed(e)
+            return
+        self._reached()
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(self.prefix + '*'):
+                self.client.delete(key)
+        except self.errors as e:
+            self._failed(e)
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_cache():
+    """The app's view cache, created on first use"""
+    app = current_app._get_current_object()
+    with _backends_lock:
+        cache = _backends.get(app)
+        if cache is None:
+            ttl = app.config.get('CACHE_TTL', 300)
+            url = app.config.get('CACHE_REDIS_URL')
+            if url:
+                try:
+                    cache = RedisCache(url, ttl=ttl)
+                except Exception as e:
+                    logger.error("Shared cache unavailable, using in-process cache: %s", e)
+            if cache is None:
+                cache = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 256), ttl)
+            _backends[app] = cache
+        return cache
+
+def schedule_version():
+    return schedule_state()[0]
+
+def schedule_state():
+    """(version, time of the last schedule write as an aware UTC datetime or None)"""
+    row = db.session.query(ScheduleVersion.version, ScheduleVersion.updated_at).filter(
+        ScheduleVersion.id == 1
+    ).first()
+    if row is None:
+        return 0, None
+    updated_at = row.updated_at.replace(tzinfo=timezone.utc) if row.updated_at else None
+    return row.version, updated_at
+
+def bump_schedule_version():
+    """Move the schedule version on; runs in the caller's transaction, does not commit"""
+    now = datetime.utcnow()
+    updated = ScheduleVersion.query.filter(ScheduleVersion.id == 1).update(
+        {'version': ScheduleVersion.version + 1, 'updated_at': now}, synchronize_session=False
+    )
+    if not updated:
+        db.session.add(ScheduleVersion(id=1, version=1, updated_at=now))
+        db.session.flush()
+
+def last_modified(updated_at, today):
+    """Last-Modified for a page keyed on today and the schedule version.
+
+    Windows relative to today move at midnight without a write, so the page
+    is never older than the start of today. HTTP dates have whole seconds.
+    """
+    midnight = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+    modified = max(updated_at, midnight) if updated_at else midnight
+    return modified.replace(microsecond=0)
+
+def _not_modified_since(modified):
+    since = request.if_modified_since
+    if since is None or request.if_none_match:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return modified <= since
+
+def cached_view(name):
+    """Cache a view's 200 responses and answer If-None-Match or If-Modified-Since with 304.
+
+    Pages rendered while a flash message is pending are neither served from
+    nor stored in the cache, since they are meant for one visitor.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            today = datetime.now().date()
+            version, updated_at = schedule_state()
+            key = f"{name}|{request.full_path}|{today}|{version}"
+            etag = hashlib.md5(key.encode()).hexdigest()
+            modified = last_modified(updated_at, today)
+            if etag in request.if_none_match or _not_modified_since(modified):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                response.last_modified = modified
+                return response
+
+            cache = get_cache()
+            entry = cache.get(etag)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+                    return response
+                entry = (response.get_data(), response.mimetype)
+                cache.set(etag, entry)
+            body, mimetype = entry
+            response = make_response(body)
+            response.mimetype = mimetype
+            response.set_etag(etag)
+            response.last_modified = modified
+            # Let browsers keep the page but check back every time
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
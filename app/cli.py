@@ -0,0 +1,112 @@
+"""Deploy-time commands: run them explicitly instead of on every app boot.
+
+    flask init-db        create tables, upgrade the schema, seed caregivers and the template
+    flask migrate        create missing tables and upgrade the schema only
+    flask sync-template  rebuild this week's shifts from the weekly template
+
+Set FLASK_APP=wsgi (Render already does) so flask can find the app.
+"""
+from .models import db, Caregiver
+from sqlalchemy import inspect, text
+from datetime import datetime
+import click
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Indexes added after the tables first shipped; create_all only builds
+# indexes for tables it creates
+INDEXES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS uq_shift_date_type_slot ON shift (date, shift_type, slot)',
+    'CREATE INDEX IF NOT EXISTS ix_shift_caregiver_date ON shift (caregiver_id, date)',
+    'CREATE INDEX IF NOT EXISTS ix_time_off_caregiver_range ON time_off (caregiver_id, start_date, end_date)',
+    'CREATE INDEX IF NOT EXISTS ix_time_off_range ON time_off (start_date, end_date)',
+]
+
+def upgrade_schema():
+    """Create missing tables, add shift.slot, schedule_version.updated_at and the indexes.
+
+    Safe to run more than once; works on SQLite and Postgres. Existing rows
+    that share a date and shift type (two B shifts, say) are numbered 0, 1, ...
+    in id order before the unique index is created. Plain 'G' shifts from
+    older generator runs become G1 (slot 0) and G2 (slot 1).
+    """
+    db.create_all()
+    columns = {c['name'] for c in inspect(db.engine).get_columns('shift')}
+    version_columns = {c['name'] for c in inspect(db.engine).get_columns('schedule_version')}
+    with db.engine.begin() as conn:
+        if 'updated_at' not in version_columns:
+            logger.info("Adding schedule_version.updated_at")
+            conn.execute(text('ALTER TABLE schedule_version ADD COLUMN updated_at TIMESTAMP'))
+
+        if 'slot' not in columns:
+            logger.info("Adding shift.slot")
+            conn.execute(text('ALTER TABLE shift ADD COLUMN slot INTEGER NOT NULL DEFAULT 0'))
+
+            # Number duplicate (date, shift_type) rows so the unique index can be built
+            conn.execute(text('''
+                UPDATE shift SET slot = (
+                    SELECT COUNT(*) FROM shift AS earlier
+                    WHERE earlier.date = shift.date
+                      AND earlier.shift_type = shift.shift_type
+                      AND earlier.id < shift.id
+                )
+            '''))
+
+        # The generator used to write both G shifts as plain 'G' in slots 0 and 1,
+        # a type with no hours; they are the G1 and G2 shifts
+        migrated = conn.execute(text('''
+            UPDATE shift SET shift_type = CASE slot WHEN 0 THEN 'G1' ELSE 'G2' END, slot = 0
+            WHERE shift_type = 'G' AND slot IN (0, 1) AND NOT EXISTS (
+                SELECT 1 FROM shift AS other
+                WHERE other.date = shift.date
+                  AND other.shift_type = CASE shift.slot WHEN 0 THEN 'G1' ELSE 'G2' END
+            )
+        ''')).rowcount
+        if migrated:
+            logger.info("Renamed %s plain G shifts to G1/G2", migrated)
+            # Cached pages (the shared cache outlives the process) show the old types
+            conn.execute(text('UPDATE schedule_version SET version = version + 1, updated_at = :now'),
+                         {'now': datetime.utcnow()})
+        left = conn.execute(text("SELECT COUNT(*) FROM shift WHERE shift_type = 'G'")).scalar()
+        if left:
+            logger.warning("%s plain G shifts clash with a G1/G2 shift on the same day; fix them by hand", left)
+
+        for statement in INDEXES:
+            conn.execute(text(statement))
+
+def init_database():
+    """Upgrade the schema, then seed caregivers and the weekly template once"""
+    upgrade_schema()
+
+    # Initialize caregivers if none exist
+    if Caregiver.query.count() == 0:
+        from .config import ShiftConfig
+        db.session.add_all([Caregiver(name=name) for name in ShiftConfig.CAREGIVERS])
+        db.session.commit()
+        logger.info("Added %s caregivers", len(ShiftConfig.CAREGIVERS))
+
+    # Move the config weekly pattern and time off into the database once
+    from .template_store import import_config_template
+    import_config_template()
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create and seed the database."""
+        init_database()
+        click.echo('Database initialized')
+
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Bring an existing database up to the current schema."""
+        upgrade_schema()
+        click.echo('Schema is up to date')
+
+    @app.cli.command('sync-template')
+    def sync_template_command():
+        """Rebuild this week's shifts from the weekly template."""
+        from .utils import ensure_sync
+        if not ensure_sync():
+            raise click.ClickException('Failed to sync weekly template to schedule')
+        click.echo('Successfully synced weekly template to schedule')
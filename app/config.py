@@ -28,6 +28,26 @@ class Config:
     # Shift types
     SHIFTS = ['Morning', 'Afternoon', 'Night']
 
+    # Schedule generation: 'solver' (branch-and-bound) or 'greedy'
+    SCHEDULE_ENGINE = os.environ.get('SCHEDULE_ENGINE', 'solver')
+    SOLVER_TIME_LIMIT = float(os.environ.get('SOLVER_TIME_LIMIT', '0.5'))  # seconds
+
+    # Rendered schedule views: in-process LRU, or Redis shared by all workers when set.
+    # Redis needs the optional redis package (pip install redis), not in requirements.txt
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', '300'))  # seconds
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+    # Background jobs: the worker heartbeats a running job every JOB_HEARTBEAT_SECONDS;
+    # a job with no heartbeat for JOB_STALE_SECONDS is taken to have lost its worker
+    JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', '30'))
+    JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '900'))
+
+    # Request/SQL timing and /metrics (see instrumentation.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') not in ('0', 'false', 'False')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+    SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '1000'))
+
 class ShiftConfig:
     SHIFTS = {
         'A': {'time': '6:00 AM - 2:00 PM', 'start_hour': 6, 'duration': 8},
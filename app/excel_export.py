@@ -0,0 +1,114 @@
+"""Hourly schedule export to .xlsx, one sheet per week.
+
+Shifts are streamed from one date-ordered query and handed to xlsxwriter
+a week at a time. The workbook runs in constant_memory mode, so each row
+is flushed to disk as soon as it is written, and goes to a temporary file
+rather than a BytesIO. Memory stays at about one week of shifts however
+long the range is.
+"""
+from .models import db, Caregiver, Shift
+from .utils import OccupancyGrid, CAREGIVER_COLORS
+from datetime import timedelta
+from itertools import groupby
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+# Rows fetched from the database per round trip while streaming
+FETCH_SIZE = 500
+
+def _weeks(start_date, end_date):
+    """(monday, dates) for every week touching the range, clipped to it"""
+    monday = start_date - timedelta(days=start_date.weekday())
+    while monday <= end_date:
+        dates = [monday + timedelta(days=i) for i in range(7)
+                 if start_date <= monday + timedelta(days=i) <= end_date]
+        yield monday, dates
+        monday += timedelta(days=7)
+
+def _shift_rows(start_date, end_date):
+    return db.session.query(Shift.date, Shift.shift_type, Caregiver.name).join(
+        Caregiver, Shift.caregiver_id == Caregiver.id
+    ).filter(
+        Shift.date >= start_date,
+        Shift.date <= end_date
+    ).order_by(Shift.date, Shift.shift_type, Shift.slot).yield_per(FETCH_SIZE)
+
+def _week_of(row):
+    return row.date - timedelta(days=row.date.weekday())
+
+class _Formats:
+    def __init__(self, workbook):
+        self.header = workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#D3D3D3', 'border': 1})
+        self.hour = workbook.add_format({'bold': True, 'align': 'center', 'border': 1})
+        self.cell = workbook.add_format({'text_wrap': True, 'valign': 'top', 'border': 1})
+        self.by_color = {}
+        self.workbook = workbook
+
+    def for_names(self, names):
+        # Colour a cell by its caregiver when one person is working that hour
+        color = CAREGIVER_COLORS.get(names[0]) if len(names) == 1 else None
+        if color is None:
+            return self.cell
+        if color not in self.by_color:
+            self.by_color[color] = self.workbook.add_format(
+                {'text_wrap': True, 'valign': 'top', 'border': 1, 'bg_color': color})
+        return self.by_color[color]
+
+def _write_week(workbook, formats, monday, dates, shifts):
+    worksheet = workbook.add_worksheet(f"Week of {monday.strftime('%Y-%m-%d')}")
+    worksheet.set_column(0, 0, 8)
+    worksheet.set_column(1, len(dates), 22)
+    worksheet.freeze_panes(1, 1)
+
+    # constant_memory needs rows written top to bottom
+    worksheet.write(0, 0, 'Time', formats.header)
+    for col, date in enumerate(dates, start=1):
+        worksheet.write(0, col, date.strftime('%A (%m/%d)'), formats.header)
+
+    grid = OccupancyGrid.build(shifts, dates)
+    for hour in range(OccupancyGrid.HOURS):
+        row = hour + 1
+        worksheet.write(row, 0, f"{hour:02d}:00", formats.hour)
+        for col, date in enumerate(dates, start=1):
+            working = grid.at(date, hour)
+            if working:
+                names = [s.name for s in working]
+                text = '\n'.join(f"{s.shift_type}: {s.name}" for s in working)
+                worksheet.write(row, col, text, formats.for_names(names))
+            else:
+                worksheet.write_blank(row, col, None, formats.cell)
+
+def write_schedule_workbook(start_date, end_date, path):
+    """Write the hourly grid for [start_date, end_date] to path; returns the sheet count"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'tmpdir': tempfile.gettempdir()})
+    formats = _Formats(workbook)
+    rows = groupby(_shift_rows(start_date, end_date), key=_week_of)
+    pending = next(rows, None)
+    sheets = 0
+    for monday, dates in _weeks(start_date, end_date):
+        shifts = []
+        if pending is not None and pending[0] == monday:
+            shifts = list(pending[1])
+            pending = next(rows, None)
+        _write_week(workbook, formats, monday, dates, shifts)
+        sheets += 1
+    workbook.close()
+    return sheets
+
+def export_schedule(start_date, end_date):
+    """Write the workbook to a temporary file and return its path; the caller removes it"""
+    with tempfile.NamedTemporaryFile(prefix='schedule-', suffix='.xlsx', delete=False) as f:
+        path = f.name
+    try:
+        sheets = write_schedule_workbook(start_date, end_date, path)
+    except Exception:
+        os.remove(path)
+        raise
+    logger.info("Exported %s weeks from %s to %s", sheets, start_date, end_date)
+    return path
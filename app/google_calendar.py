@@ -1,79 +1,199 @@
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+"""Google Calendar integration.
+
+Nothing from the Google client stack (google-auth, httplib2, the discovery
+machinery) is imported at module level: the web app imports this module
+only from the calendar sync job and /test-calendar-connection, and even
+then the event building and diffing below work without it. The stack is
+loaded on first use of get_calendar_service().
+"""
 from datetime import datetime, timedelta
-import os.path
+import json
+import os
 import pickle
+import tempfile
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
-# If modifying these scopes, delete the file token.pickle.
+# If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-def get_calendar_service():
-    """Get an authorized Calendar API service instance."""
-    creds = None
-    # Look for token file in the same directory as credentials.json
-    token_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'token.pickle')
-    credentials_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'credentials.json')
-    
-    logger.debug(f"Looking for token at: {token_path}")
-    logger.debug(f"Looking for credentials at: {credentials_path}")
-    
-    # The file token.pickle stores the user's access and refresh tokens
-    if os.path.exists(token_path):
-        logger.debug("Found existing token.pickle")
+# Local copy of the Calendar v3 discovery document; defaults to the one
+# bundled with google-api-python-client
+DISCOVERY_DOCUMENT = os.environ.get('CALENDAR_DISCOVERY_DOCUMENT')
+
+_discovery = {'document': None}
+_discovery_lock = threading.Lock()
+
+def discovery_document():
+    """Calendar v3 discovery document, read and parsed once per process"""
+    with _discovery_lock:
+        if _discovery['document'] is None:
+            if DISCOVERY_DOCUMENT:
+                with open(DISCOVERY_DOCUMENT) as f:
+                    content = f.read()
+            else:
+                from googleapiclient.discovery_cache import get_static_doc
+                content = get_static_doc('calendar', 'v3')
+                if content is None:
+                    raise FileNotFoundError("Calendar v3 discovery document not found")
+            _discovery['document'] = json.loads(content)
+        return _discovery['document']
+
+def build_service(creds=None, http=None):
+    """Calendar service from the cached discovery document, no discovery fetch.
+
+    Pass either credentials or an already authorized http.
+    """
+    from googleapiclient.discovery import build_from_document
+    if http is not None:
+        return build_from_document(discovery_document(), http=http)
+    return build_from_document(discovery_document(), credentials=creds)
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CREDENTIALS_PATH = os.environ.get('GOOGLE_CREDENTIALS_FILE', os.path.join(_ROOT, 'credentials.json'))
+TOKEN_PATH = os.environ.get('GOOGLE_TOKEN_FILE', os.path.join(_ROOT, 'token.json'))
+# Tokens used to be pickled here; migrated to TOKEN_PATH on first load
+LEGACY_TOKEN_PATH = os.path.join(os.path.dirname(TOKEN_PATH), 'token.pickle')
+# Refresh this long before the access token expires, not on the first 401
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# One set of credentials per process, shared by every thread; one service
+# (and so one keep-alive HTTP connection) per thread, since httplib2 is
+# not thread-safe. generation is bumped to make threads rebuild.
+_auth = {'creds': None, 'generation': 0, 'refresh_request': None}
+_auth_lock = threading.RLock()
+_local = threading.local()
+
+def save_credentials(creds, path=None):
+    """Write credentials as JSON atomically: temp file, fsync, rename"""
+    path = path or TOKEN_PATH
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(creds.to_json())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_credentials():
+    """Stored credentials, migrating a legacy token.pickle to JSON; None if there are none"""
+    from google.oauth2.credentials import Credentials
+
+    if os.path.exists(TOKEN_PATH):
+        try:
+            return Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+        except Exception as e:
+            logger.error("Error loading token: %s", e)
+            return None
+
+    if os.path.exists(LEGACY_TOKEN_PATH):
         try:
-            with open(token_path, 'rb') as token:
+            with open(LEGACY_TOKEN_PATH, 'rb') as token:
                 creds = pickle.load(token)
+            save_credentials(creds)
+            os.remove(LEGACY_TOKEN_PATH)
+            logger.info("Migrated %s to %s", LEGACY_TOKEN_PATH, TOKEN_PATH)
+            return creds
         except Exception as e:
-            logger.error(f"Error loading token: {e}")
-            creds = None
-    
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            logger.debug("Refreshing expired credentials")
-            try:
-                creds.refresh(Request())
-            except Exception as e:
-                logger.error(f"Error refreshing credentials: {e}")
+            logger.error("Error migrating token.pickle: %s", e)
+    return None
+
+def _needs_refresh(creds):
+    if not creds.valid:
+        return True
+    # expiry is a naive UTC datetime
+    return creds.expiry is not None and creds.expiry - REFRESH_MARGIN <= datetime.utcnow()
+
+def _refresh_request():
+    """Token refresh transport, reusing one requests session"""
+    if _auth['refresh_request'] is None:
+        import requests
+        from google.auth.transport.requests import Request
+        _auth['refresh_request'] = Request(session=requests.Session())
+    return _auth['refresh_request']
+
+def _run_oauth_flow():
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    if not os.path.exists(CREDENTIALS_PATH):
+        raise FileNotFoundError(
+            "credentials.json not found. Please download it from Google Cloud Console "
+            "and place it in the project root directory."
+        )
+    logger.debug("Starting new OAuth flow")
+    try:
+        flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_PATH, SCOPES)
+        return flow.run_local_server(port=0)
+    except Exception as e:
+        logger.error("Error in OAuth flow: %s", e)
+        raise
+
+def get_credentials():
+    """Process-wide credentials, refreshed shortly before they expire"""
+    with _auth_lock:
+        creds = _auth['creds'] or load_credentials()
+
+        if creds is not None and _needs_refresh(creds):
+            if creds.refresh_token:
+                logger.debug("Refreshing calendar credentials")
+                try:
+                    creds.refresh(_refresh_request())
+                    save_credentials(creds)
+                except Exception as e:
+                    logger.error("Error refreshing credentials: %s", e)
+                    creds = None
+            else:
                 creds = None
-        
-        if not creds:
-            if not os.path.exists(credentials_path):
-                raise FileNotFoundError(
-                    "credentials.json not found. Please download it from Google Cloud Console "
-                    "and place it in the project root directory."
-                )
-            
-            logger.debug("Starting new OAuth flow")
+
+        if creds is None:
+            creds = _run_oauth_flow()
             try:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    credentials_path, SCOPES)
-                creds = flow.run_local_server(port=0)
+                save_credentials(creds)
             except Exception as e:
-                logger.error(f"Error in OAuth flow: {e}")
-                raise
-        
-        # Save the credentials for the next run
+                logger.error("Error saving token: %s", e)
+
+        if creds is not _auth['creds']:
+            # New credentials object: every thread builds a fresh service
+            _auth['creds'] = creds
+            _auth['generation'] += 1
+        return creds
+
+def get_calendar_service():
+    """Authorized Calendar API service, built once per thread and reused.
+
+    Credentials are checked (and refreshed ahead of expiry) on every call,
+    but the service and its HTTP connection are only rebuilt when the
+    credentials object changes.
+    """
+    creds = get_credentials()
+    generation = _auth['generation']
+    if getattr(_local, 'generation', None) != generation:
         try:
-            with open(token_path, 'wb') as token:
-                pickle.dump(creds, token)
-            logger.debug("Saved new token.pickle")
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+
+            http = AuthorizedHttp(creds, http=httplib2.Http())
+            _local.service = build_service(http=http)
+            _local.generation = generation
+            logger.debug("Successfully built calendar service")
         except Exception as e:
-            logger.error(f"Error saving token: {e}")
-    
-    try:
-        service = build('calendar', 'v3', credentials=creds)
-        logger.debug("Successfully built calendar service")
-        return service
-    except Exception as e:
-        logger.error(f"Error building calendar service: {e}")
-        raise
+            logger.error("Error building calendar service: %s", e)
+            raise
+    return _local.service
+
+def reset_calendar_service():
+    """Forget cached credentials and services, e.g. after re-authorizing"""
+    with _auth_lock:
+        _auth['creds'] = None
+        _auth['generation'] += 1
 
 def get_shift_color(shift_type):
     """Return the Google Calendar color ID for each shift type."""
@@ -135,91 +255,182 @@ def get_shift_times(shift_type, date):
     
     return start_time, end_time
 
-def sync_shifts_to_calendar(shifts, calendar_id='primary'):
-    """Sync shifts to Google Calendar."""
+# Events created by the sync carry the shift's (date, type, slot) in a private
+# extended property. Shift ids change whenever a range is rewritten; this does not.
+SHIFT_KEY_PROPERTY = 'shiftKey'
+# Tag used before shift keys; such events are replaced once
+LEGACY_SHIFT_ID_PROPERTY = 'shiftId'
+# Calendar batch requests accept at most 50 calls
+BATCH_SIZE = 50
+
+def shift_key(shift):
+    return f"{shift.date.isoformat()}|{shift.shift_type}|{shift.slot}"
+
+def build_shift_event(shift):
+    """Calendar event body for a shift, tagged with its shift key"""
+    start_time, end_time = get_shift_times(shift.shift_type, shift.date)
+    return {
+        'summary': f"{shift.shift_type} - {shift.caregiver.name}",
+        'description': f"Shift Type: {shift.shift_type}\nCaregiver: {shift.caregiver.name}",
+        'start': {
+            'dateTime': start_time.astimezone().isoformat(),
+            'timeZone': 'America/New_York',
+        },
+        'end': {
+            'dateTime': end_time.astimezone().isoformat(),
+            'timeZone': 'America/New_York',
+        },
+        'colorId': get_shift_color(shift.shift_type),
+        'reminders': {
+            'useDefault': True
+        },
+        'extendedProperties': {
+            'private': {SHIFT_KEY_PROPERTY: shift_key(shift)}
+        }
+    }
+
+def list_events(service, calendar_id, time_min, time_max):
+    """All events in the window, following pagination"""
+    events = []
+    page_token = None
+    while True:
+        result = service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            maxResults=2500,
+            pageToken=page_token
+        ).execute()
+        events.extend(result.get('items', []))
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return events
+
+def _event_shift_key(event):
+    return event.get('extendedProperties', {}).get('private', {}).get(SHIFT_KEY_PROPERTY)
+
+def _is_legacy_shift_event(event):
+    # Events tagged with a shift id, or written before events were tagged at all
+    if LEGACY_SHIFT_ID_PROPERTY in event.get('extendedProperties', {}).get('private', {}):
+        return True
+    return (event.get('description') or '').startswith('Shift Type:')
+
+def _instant(value):
+    """Parse an RFC3339 dateTime so offsets written differently still compare equal"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def _event_matches(existing, wanted):
+    return (existing.get('summary') == wanted['summary'] and
+            existing.get('description') == wanted['description'] and
+            existing.get('colorId') == wanted['colorId'] and
+            _instant(existing.get('start', {}).get('dateTime')) == _instant(wanted['start']['dateTime']) and
+            _instant(existing.get('end', {}).get('dateTime')) == _instant(wanted['end']['dateTime']))
+
+def diff_events(shifts, events):
+    """Work out the calendar writes that bring events in line with shifts.
+
+    Returns (inserts, updates, deletes): event bodies to insert,
+    (event id, body) pairs to update and event ids to delete. Events are
+    matched on the shift key, so a rewritten range with the same shifts
+    needs no writes and a reassigned slot is one update. Tagged events
+    whose slot is empty now, duplicate events for a slot and events left
+    by older syncs are deleted; other events are left alone.
+    """
+    wanted = {shift_key(shift): build_shift_event(shift) for shift in shifts}
+    updates, deletes = [], []
+    seen = set()
+    for event in events:
+        key = _event_shift_key(event)
+        if key is None:
+            if _is_legacy_shift_event(event):
+                deletes.append(event['id'])
+            continue
+        if key not in wanted or key in seen:
+            deletes.append(event['id'])
+            continue
+        seen.add(key)
+        if not _event_matches(event, wanted[key]):
+            updates.append((event['id'], wanted[key]))
+    inserts = [body for key, body in wanted.items() if key not in seen]
+    return inserts, updates, deletes
+
+def execute_batched(service, requests):
+    """Send requests through the batch endpoint, BATCH_SIZE calls per HTTP round trip.
+
+    Returns the number of calls that failed; failures are logged, not raised,
+    so one bad event does not abort the rest of the sync.
+    """
+    errors = []
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            logger.error("Calendar batch call %s failed: %s", request_id, exception)
+            errors.append(request_id)
+
+    for offset in range(0, len(requests), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=callback)
+        for request in requests[offset:offset + BATCH_SIZE]:
+            batch.add(request)
+        batch.execute()
+    return len(errors)
+
+def sync_shifts_to_calendar(shifts, calendar_id='primary', service=None, start_date=None, end_date=None):
+    """Sync shifts to Google Calendar.
+
+    Lists the events from start_date to end_date inclusive (default: the
+    shifts' date range), diffs them against the shifts by the tagged shift
+    key and sends only the inserts, updates and deletes that are needed, in
+    batches. Pass the window that was synced so events for shifts removed
+    at its edges are listed and deleted too; with a window, an empty shift
+    list clears the synced events in it. Re-syncing an unchanged
+    schedule makes no write calls. Pass service to use an already built
+    (or fake) Calendar service. Returns counts of what changed.
+    """
+    if not shifts and (start_date is None or end_date is None):
+        return {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'errors': 0}
+
     try:
-        service = get_calendar_service()
+        service = service or get_calendar_service()
         logger.info("Connected to Google Calendar API")
         
-        # Get existing events in the date range to avoid duplicates
-        start_min = min(shift.date for shift in shifts)
-        end_max = max(shift.date for shift in shifts) + timedelta(days=1)
+        start_min = start_date or min(shift.date for shift in shifts)
+        end_max = (end_date or max(shift.date for shift in shifts)) + timedelta(days=1)
         
         # Format dates in RFC3339 format with UTC timezone
         time_min = datetime.combine(start_min, datetime.min.time()).astimezone().isoformat()
         time_max = datetime.combine(end_max, datetime.min.time()).astimezone().isoformat()
         
-        logger.debug(f"Fetching events between {time_min} and {time_max}")
-        
-        # Delete existing events in the date range
         try:
-            events_result = service.events().list(
-                calendarId=calendar_id,
-                timeMin=time_min,
-                timeMax=time_max,
-                singleEvents=True
-            ).execute()
-            
-            for event in events_result.get('items', []):
-                try:
-                    service.events().delete(
-                        calendarId=calendar_id,
-                        eventId=event['id']
-                    ).execute()
-                    logger.debug(f"Deleted existing event: {event.get('summary')}")
-                except HttpError as e:
-                    logger.error(f"Error deleting event {event.get('id')}: {e}")
-        except HttpError as e:
-            logger.error(f"Error listing events: {e}")
-            if e.resp.status == 400:
-                logger.error(f"Bad Request - Request details: {e.content}")
+            events = list_events(service, calendar_id, time_min, time_max)
+        except Exception as e:
+            logger.error("Error listing events: %s", e)
+            # HttpError from googleapiclient; checked by shape to keep the import lazy
+            if getattr(getattr(e, 'resp', None), 'status', None) == 400:
+                logger.error("Bad Request - Request details: %s", e.content)
             raise
         
-        # Create new events for each shift
-        events_created = 0
-        for shift in shifts:
-            try:
-                start_time, end_time = get_shift_times(shift.shift_type, shift.date)
-                
-                # Convert to local timezone and format for Google Calendar
-                event = {
-                    'summary': f"{shift.shift_type} - {shift.caregiver.name}",
-                    'description': f"Shift Type: {shift.shift_type}\nCaregiver: {shift.caregiver.name}",
-                    'start': {
-                        'dateTime': start_time.astimezone().isoformat(),
-                        'timeZone': 'America/New_York',
-                    },
-                    'end': {
-                        'dateTime': end_time.astimezone().isoformat(),
-                        'timeZone': 'America/New_York',
-                    },
-                    'colorId': get_shift_color(shift.shift_type),
-                    'reminders': {
-                        'useDefault': True
-                    }
-                }
-                
-                logger.debug(f"Creating event: {event}")
-                event = service.events().insert(calendarId=calendar_id, body=event).execute()
-                events_created += 1
-                logger.debug(f"Created event: {event.get('htmlLink')}")
-            except HttpError as e:
-                logger.error(f"Error creating event for shift {shift.id}: {e}")
-                if e.resp.status == 400:
-                    logger.error(f"Bad Request - Event details: {event}")
-                    logger.error(f"Response content: {e.content}")
-                continue  # Continue with next shift if one fails
+        inserts, updates, deletes = diff_events(shifts, events)
+        calendar_events = service.events()
+        requests = (
+            [calendar_events.delete(calendarId=calendar_id, eventId=event_id) for event_id in deletes] +
+            [calendar_events.update(calendarId=calendar_id, eventId=event_id, body=body) for event_id, body in updates] +
+            [calendar_events.insert(calendarId=calendar_id, body=body) for body in inserts]
+        )
+        errors = execute_batched(service, requests)
         
-        logger.info(f"Successfully synced {events_created} shifts to Google Calendar")
-        return True
+        result = {
+            'inserted': len(inserts),
+            'updated': len(updates),
+            'deleted': len(deletes),
+            'unchanged': len(shifts) - len(inserts) - len(updates),
+            'errors': errors
+        }
+        logger.info("Synced %s shifts to Google Calendar: %s", len(shifts), result)
+        return result
         
     except Exception as e:
-        logger.error(f"Error syncing to Google Calendar: {str(e)}")
-        raise 
-
-def clear_calendar_cache():
-    """Clear any cached calendar data"""
-    # If using Flask-Caching
-    if cache:
-        cache.delete('monthly_schedule')
-        cache.delete('weekly_schedule') 
\ No newline at end of file
+        logger.error("Error syncing to Google Calendar: %s", e)
+        raise
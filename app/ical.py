@@ -0,0 +1,107 @@
+"""iCalendar (.ics) feeds of the schedule, per caregiver and for the house.
+
+Phone and desktop calendar apps subscribe to these URLs and poll them, so
+the feeds are served through cached_view: an unchanged schedule costs a
+304 (or a cache hit) rather than a query and a render.
+
+Each shift's UID comes from its date, shift type and slot, which survive
+regenerating the schedule, so a reassigned shift updates the existing
+event instead of showing up as a new one. Event bodies are memoized on
+(date, shift type, slot, caregiver), so after a write only the shifts that
+changed are rendered again.
+"""
+from .models import db, Caregiver, Shift
+from .google_calendar import get_shift_times
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import os
+
+MIMETYPE = 'text/calendar'
+PRODID = '-//Group Home Scheduler//Schedule Feed//EN'
+UID_DOMAIN = 'grouphomescheduler'
+# Shift times are wall-clock times in the house's time zone (the Google sync uses the same one)
+TIMEZONE = ZoneInfo(os.environ.get('CALENDAR_TIMEZONE', 'America/New_York'))
+# Window served relative to today
+FEED_PAST_DAYS = 28
+FEED_FUTURE_DAYS = 182
+# Hint to clients that honour it; revalidating sooner is cheap anyway
+REFRESH_INTERVAL = 'PT15M'
+
+def feed_window(today=None):
+    today = today or datetime.now().date()
+    return today - timedelta(days=FEED_PAST_DAYS), today + timedelta(days=FEED_FUTURE_DAYS)
+
+def shift_uid(date, shift_type, slot):
+    return f"{date.strftime('%Y%m%d')}-{shift_type}-{slot}@{UID_DOMAIN}"
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # Never split a multi-byte character
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+def _utc(moment):
+    return moment.replace(tzinfo=TIMEZONE).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+@lru_cache(maxsize=8192)
+def _event_body(date, shift_type, slot, name):
+    """Lines of a VEVENT after UID and DTSTAMP"""
+    start_time, end_time = get_shift_times(shift_type, date)
+    return ''.join(_fold(line) for line in (
+        f"DTSTART:{_utc(start_time)}",
+        f"DTEND:{_utc(end_time)}",
+        f"SUMMARY:{_escape(f'{shift_type} - {name}')}",
+        f"DESCRIPTION:{_escape(f'Shift Type: {shift_type}')}\\n{_escape(f'Caregiver: {name}')}",
+        f"CATEGORIES:{_escape(shift_type)}",
+        'TRANSP:OPAQUE',
+        'END:VEVENT',
+    ))
+
+def _shift_rows(start_date, end_date, caregiver_id=None):
+    query = db.session.query(Shift.date, Shift.shift_type, Shift.slot, Caregiver.name).join(
+        Caregiver, Shift.caregiver_id == Caregiver.id
+    ).filter(
+        Shift.date >= start_date,
+        Shift.date <= end_date
+    )
+    if caregiver_id is not None:
+        query = query.filter(Shift.caregiver_id == caregiver_id)
+    return query.order_by(Shift.date, Shift.shift_type, Shift.slot)
+
+def build_feed(title, start_date, end_date, caregiver_id=None, stamp=None):
+    """The VCALENDAR text for shifts from start_date to end_date inclusive.
+
+    stamp is the DTSTAMP of every event, normally the time of the last
+    schedule write.
+    """
+    dtstamp = (stamp or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    parts = [''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(title)}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}',
+        f'X-PUBLISHED-TTL:{REFRESH_INTERVAL}',
+    ))]
+    for date, shift_type, slot, name in _shift_rows(start_date, end_date, caregiver_id):
+        parts.append(f"BEGIN:VEVENT\r\nUID:{shift_uid(date, shift_type, slot)}\r\nDTSTAMP:{dtstamp}\r\n")
+        parts.append(_event_body(date, shift_type, slot, name))
+    parts.append('END:VCALENDAR\r\n')
+    return ''.join(parts)
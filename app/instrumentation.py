@@ -0,0 +1,190 @@
+"""Per-request timing, SQL query counting and a slow-query log.
+
+Every request records its wall time, how many SQL statements it issued and
+how long they took, aggregated per endpoint. Statements slower than
+SLOW_QUERY_MS are logged with their parameters, wherever they run (worker
+jobs included), and so are requests slower than SLOW_REQUEST_MS. The
+aggregates are served at /metrics in the Prometheus text format.
+
+Aggregates live in the process: under gunicorn each worker keeps and
+serves its own, so scrape each worker or read them as a sample.
+"""
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Longest repr of a statement's parameters put in the slow-query log
+MAX_LOGGED_PARAMETERS = 500
+
+class RequestMetrics:
+    """Thread-safe per-endpoint aggregates of requests and their SQL"""
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests = {}   # (endpoint, method, status) -> count
+        self.durations = {}  # endpoint -> [bucket counts..., sum, count]
+        self.queries = {}    # endpoint -> statements issued
+        self.db_time = {}    # endpoint -> seconds spent in statements
+        self.slow_queries = 0
+
+    def record(self, endpoint, method, status, seconds, queries, db_seconds):
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.durations.get(endpoint)
+            if histogram is None:
+                histogram = self.durations[endpoint] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            self.queries[endpoint] = self.queries.get(endpoint, 0) + queries
+            self.db_time[endpoint] = self.db_time.get(endpoint, 0.0) + db_seconds
+
+    def record_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.durations.clear()
+            self.queries.clear()
+            self.db_time.clear()
+            self.slow_queries = 0
+
+    def render(self):
+        """The aggregates in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP ghs_http_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE ghs_http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'ghs_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+            lines += [
+                '# HELP ghs_http_request_duration_seconds Wall time spent handling requests.',
+                '# TYPE ghs_http_request_duration_seconds histogram',
+            ]
+            for endpoint, histogram in sorted(self.durations.items()):
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(f'ghs_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=_number(bound))} {count}')
+                lines.append(f'ghs_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le="+Inf")} {histogram[-1]}')
+                lines.append(f'ghs_http_request_duration_seconds_sum{_labels(endpoint=endpoint)} {_number(histogram[-2])}')
+                lines.append(f'ghs_http_request_duration_seconds_count{_labels(endpoint=endpoint)} {histogram[-1]}')
+
+            lines += [
+                '# HELP ghs_db_queries_total SQL statements issued while handling requests.',
+                '# TYPE ghs_db_queries_total counter',
+            ]
+            for endpoint, count in sorted(self.queries.items()):
+                lines.append(f'ghs_db_queries_total{_labels(endpoint=endpoint)} {count}')
+
+            lines += [
+                '# HELP ghs_db_query_duration_seconds_total Time spent in SQL statements while handling requests.',
+                '# TYPE ghs_db_query_duration_seconds_total counter',
+            ]
+            for endpoint, seconds in sorted(self.db_time.items()):
+                lines.append(f'ghs_db_query_duration_seconds_total{_labels(endpoint=endpoint)} {_number(seconds)}')
+
+            lines += [
+                '# HELP ghs_db_slow_queries_total SQL statements slower than the slow-query threshold.',
+                '# TYPE ghs_db_slow_queries_total counter',
+                f'ghs_db_slow_queries_total {self.slow_queries}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + '}'
+
+def _number(value):
+    return repr(float(value))
+
+metrics = RequestMetrics()
+_thresholds = {'slow_query': 0.2}
+_listeners = {'installed': False}
+_listeners_lock = threading.Lock()
+
+def _statement_text(statement):
+    return re.sub(r'\s+', ' ', statement).strip()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    if has_request_context():
+        g.metrics_queries = g.get('metrics_queries', 0) + 1
+        g.metrics_db_time = g.get('metrics_db_time', 0.0) + elapsed
+    if elapsed >= _thresholds['slow_query']:
+        metrics.record_slow_query()
+        shown = repr(parameters)
+        if len(shown) > MAX_LOGGED_PARAMETERS:
+            shown = shown[:MAX_LOGGED_PARAMETERS] + '...'
+        where = f" in {request.endpoint}" if has_request_context() else ''
+        logger.warning("Slow query (%.1f ms)%s: %s parameters=%s",
+                       elapsed * 1000, where, _statement_text(statement), shown)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_start_time'):
+        conn.info['query_start_time'].pop()
+
+def _install_listeners():
+    """Listen on every Engine once per process; the engine is created lazily per app"""
+    with _listeners_lock:
+        if _listeners['installed']:
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        _listeners['installed'] = True
+
+def init_instrumentation(app):
+    """Hook request timing into app, install the SQL listeners and add /metrics"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _thresholds['slow_query'] = app.config.get('SLOW_QUERY_MS', 200) / 1000
+    slow_request = app.config.get('SLOW_REQUEST_MS', 1000) / 1000
+    _install_listeners()
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_time = 0.0
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        queries = g.get('metrics_queries', 0)
+        db_time = g.get('metrics_db_time', 0.0)
+        metrics.record(endpoint, request.method, response.status_code, elapsed, queries, db_time)
+        response.headers['Server-Timing'] = f"app;dur={elapsed * 1000:.1f}, db;dur={db_time * 1000:.1f}"
+        if elapsed >= slow_request:
+            logger.warning("Slow request %s %s -> %s: %.0f ms, %d queries, %.0f ms in SQL",
+                           request.method, request.full_path, endpoint, elapsed * 1000, queries, db_time * 1000)
+        return response
+
+    def metrics_view():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', metrics_view)
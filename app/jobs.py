@@ -0,0 +1,233 @@
+from .models import db, Job
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+# Seconds to wait before each retry of a failed attempt
+RETRY_DELAYS = [5, 30, 120]
+# A running job with no heartbeat for this long is requeued (JOB_STALE_SECONDS overrides)
+STALE_AFTER = timedelta(minutes=15)
+# How often the worker heartbeats the job it is running (JOB_HEARTBEAT_SECONDS overrides)
+HEARTBEAT_INTERVAL = 30
+
+class Heartbeat:
+    """Keeps a running job's heartbeat fresh from a background thread.
+
+    Handlers only heartbeat when they report progress, and a long
+    materialize or calendar sync may report none for longer than the stale
+    timeout; without this the job would be requeued and run twice. The
+    thread writes on its own connection, and only while the job is still
+    running on this worker.
+    """
+    def __init__(self, job_id, worker_id, interval):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.engine = db.engine
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{job_id}', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(Job.__table__.update().where(
+                        Job.id == self.job_id,
+                        Job.status == 'running',
+                        Job.worker == self.worker_id
+                    ).values(heartbeat_at=datetime.utcnow()))
+            except Exception as e:
+                # A missed beat is harmless while the next ones land
+                logger.warning("Heartbeat for job %s failed: %s", self.job_id, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+class JobContext:
+    """Handed to a job handler: its params and a way to report progress"""
+    def __init__(self, job):
+        self.job_id = job.id
+        self.params = json.loads(job.params or '{}')
+
+    def progress(self, percent, message=None):
+        """Record progress and heartbeat. Commits the session, so only call
+        it between units of work that are safe to commit."""
+        Job.query.filter(Job.id == self.job_id).update({
+            'progress': max(0, min(100, int(percent))),
+            'message': message,
+            'heartbeat_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+
+def job_to_dict(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+def enqueue(kind, params=None, idempotency_key=None, max_attempts=3):
+    """Queue a job and return (job, created).
+
+    With an idempotency key the job first created under that key is
+    returned on every later call. Without one, a queued or running job of
+    the same kind and params is reused, so repeated clicks share one job.
+    """
+    params_json = json.dumps(params or {}, sort_keys=True)
+    if idempotency_key:
+        job = Job.query.filter_by(idempotency_key=idempotency_key).first()
+    else:
+        job = Job.query.filter(
+            Job.kind == kind,
+            Job.params == params_json,
+            Job.status.in_(ACTIVE_STATUSES)
+        ).order_by(Job.id).first()
+    if job:
+        return job, False
+
+    job = Job(kind=kind, params=params_json, idempotency_key=idempotency_key,
+              max_attempts=max_attempts, run_after=datetime.utcnow())
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request enqueued the same key first
+        db.session.rollback()
+        return Job.query.filter_by(idempotency_key=idempotency_key).first(), False
+    logger.info("Enqueued job %s (%s)", job.id, kind)
+    return job, True
+
+def retry_job(job):
+    """Put a failed job back on the queue; any other job is returned unchanged"""
+    if job.status == 'failed':
+        job.status = 'queued'
+        job.attempts = 0
+        job.error = None
+        job.progress = 0
+        job.message = None
+        job.finished_at = None
+        job.run_after = datetime.utcnow()
+        db.session.commit()
+    return job
+
+def claim_next(worker_id):
+    """Atomically move the oldest due job from queued to running"""
+    now = datetime.utcnow()
+    due = db.session.query(Job.id).filter(
+        Job.status == 'queued',
+        Job.run_after <= now
+    ).order_by(Job.run_after, Job.id).limit(10).all()
+    for (job_id,) in due:
+        # Conditional update: only one worker can win the queued -> running change
+        claimed = Job.query.filter(Job.id == job_id, Job.status == 'queued').update({
+            'status': 'running',
+            'worker': worker_id,
+            'attempts': Job.attempts + 1,
+            'started_at': now,
+            'heartbeat_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return Job.query.get(job_id)
+    return None
+
+def requeue_stale(stale_after=None):
+    """Return jobs whose worker died mid-run to the queue (or fail them when out of attempts)"""
+    if stale_after is None:
+        stale_after = timedelta(seconds=current_app.config.get('JOB_STALE_SECONDS', STALE_AFTER.total_seconds()))
+    cutoff = datetime.utcnow() - stale_after
+    stale = Job.query.filter(Job.status == 'running', Job.heartbeat_at < cutoff).all()
+    for job in stale:
+        logger.warning("Job %s (%s) lost its worker %s", job.id, job.kind, job.worker)
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = datetime.utcnow()
+        else:
+            job.status = 'failed'
+            job.error = 'Worker stopped responding'
+            job.finished_at = datetime.utcnow()
+    if stale:
+        db.session.commit()
+    return len(stale)
+
+def run_job(job):
+    """Run a claimed job's handler and record the outcome"""
+    from .tasks import HANDLERS
+    job_id = job.id
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"No handler for job kind '{job.kind}'")
+        result = handler(JobContext(job))
+        job = Job.query.get(job_id)
+        job.status = 'succeeded'
+        job.progress = 100
+        job.message = result.get('message', '')[:200] if isinstance(result, dict) else None
+        job.result = json.dumps(result)
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        logger.info("Job %s (%s) succeeded", job_id, job.kind)
+    except Exception as e:
+        db.session.rollback()
+        job = Job.query.get(job_id)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = RETRY_DELAYS[min(job.attempts, len(RETRY_DELAYS)) - 1]
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning("Job %s (%s) attempt %s failed, retrying in %ss: %s",
+                           job_id, job.kind, job.attempts, delay, e)
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            logger.error("Job %s (%s) failed after %s attempts: %s", job_id, job.kind, job.attempts, e)
+        db.session.commit()
+    return job
+
+def work(app, poll_interval=1.0, once=False):
+    """Worker loop: claim and run jobs until stopped (or the queue is empty with once=True)"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Worker %s started", worker_id)
+    while True:
+        with app.app_context():
+            try:
+                requeue_stale()
+                job = claim_next(worker_id)
+                if job:
+                    interval = app.config.get('JOB_HEARTBEAT_SECONDS', HEARTBEAT_INTERVAL)
+                    with Heartbeat(job.id, worker_id, interval):
+                        run_job(job)
+                    continue
+            except Exception as e:
+                db.session.rollback()
+                logger.error("Worker error: %s", e)
+            finally:
+                db.session.remove()
+        if once:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,78 @@
+"""Logging set up from the environment.
+
+    LOG_LEVEL    root level (default INFO)
+    LOG_LEVELS   per-logger levels, e.g. "app.routes=DEBUG,sqlalchemy.engine=INFO"
+    LOG_FORMAT   "text" (default) or "json", one object per line
+
+A root level of DEBUG used to switch on SQLAlchemy's statement echo and
+the per-shift debug lines in every request. The noisy third-party loggers
+now have their own defaults, which LOG_LEVELS overrides. Log calls pass
+their arguments (logger.debug("%d shifts", n)) so nothing is formatted
+for a record that is filtered out.
+"""
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Kept quiet unless LOG_LEVELS asks otherwise
+DEFAULT_LEVELS = {
+    'sqlalchemy': 'WARNING',
+    'googleapiclient.discovery_cache': 'ERROR',
+    'urllib3': 'WARNING',
+}
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any extra= fields alongside"""
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def parse_levels(spec):
+    """'a=DEBUG,b.c=warning' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, level = item.partition('=')
+        if not level:
+            raise ValueError(f"LOG_LEVELS entry '{item}' is not name=LEVEL")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging(environ=None, stream=None):
+    """Install one handler on the root logger; safe to call more than once"""
+    environ = os.environ if environ is None else environ
+    root = logging.getLogger()
+    for handler in [h for h in root.handlers if getattr(h, '_ghs_handler', False)]:
+        root.removeHandler(handler)
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler._ghs_handler = True
+    if environ.get('LOG_FORMAT', 'text').lower() == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(environ.get('LOG_LEVEL', 'INFO').upper())
+
+    levels = dict(DEFAULT_LEVELS)
+    levels.update(parse_levels(environ.get('LOG_LEVELS')))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
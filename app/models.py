@@ -1,10 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from .config import ShiftConfig, TimeOffConfig
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from . import db
@@ -20,9 +18,16 @@ class Caregiver(db.Model):
 
 class Shift(db.Model):
     __tablename__ = 'shift'
+    __table_args__ = (
+        # One caregiver per slot: double-booking a slot fails at the database.
+        # Also serves date-range scans and (date, shift_type) lookups.
+        db.Index('uq_shift_date_type_slot', 'date', 'shift_type', 'slot', unique=True),
+        db.Index('ix_shift_caregiver_date', 'caregiver_id', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
     shift_type = db.Column(db.String(10), nullable=False)  # A, B, C, G1, G2
+    slot = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 0, 1 when a type is staffed twice
     caregiver_id = db.Column(db.Integer, db.ForeignKey('caregiver.id'), nullable=False)
     
     @property
@@ -55,6 +60,10 @@ class Shift(db.Model):
 
 class TimeOff(db.Model):
     __tablename__ = 'time_off'
+    __table_args__ = (
+        db.Index('ix_time_off_caregiver_range', 'caregiver_id', 'start_date', 'end_date'),
+        db.Index('ix_time_off_range', 'start_date', 'end_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     caregiver_id = db.Column(db.Integer, db.ForeignKey('caregiver.id'), nullable=False)
     start_date = db.Column(db.Date, nullable=False)
@@ -67,27 +76,76 @@ class TimeOff(db.Model):
     
     caregiver = db.relationship('Caregiver', backref='time_off')
     
-    @staticmethod
-    def get_all_time_off():
-        """Get all time off records grouped by caregiver"""
-        time_off_records = TimeOff.query.all()
-        time_off_dict = {}
-        
-        for record in time_off_records:
-            if record.caregiver.name not in time_off_dict:
-                time_off_dict[record.caregiver.name] = []
-            
-            # Add all dates in the range
-            current_date = record.start_date
-            while current_date <= record.end_date:
-                time_off_dict[record.caregiver.name].append(current_date)
-                current_date += timedelta(days=1)
-        
-        return time_off_dict
-
     def __repr__(self):
         return f'<TimeOff {self.caregiver.name} {self.start_date} to {self.end_date} ({self.status})>'
 
+class WeeklyTemplate(db.Model):
+    """Named weekly shift pattern; version is bumped on every edit"""
+    __tablename__ = 'weekly_template'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True, default='default')
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    slots = db.relationship('TemplateSlot', backref='template', lazy=True, cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<WeeklyTemplate {self.name} v{self.version}>'
+
+class TemplateSlot(db.Model):
+    """One caregiver assignment in a weekly template (weekday 0 = Monday)"""
+    __tablename__ = 'template_slot'
+    __table_args__ = (
+        db.UniqueConstraint('template_id', 'weekday', 'shift_type', name='uq_template_slot'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('weekly_template.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)
+    shift_type = db.Column(db.String(10), nullable=False)
+    caregiver_id = db.Column(db.Integer, db.ForeignKey('caregiver.id'), nullable=False)
+
+    caregiver = db.relationship('Caregiver')
+
+    def __repr__(self):
+        return f'<TemplateSlot {self.weekday} {self.shift_type} {self.caregiver_id}>'
+
+class ScheduleVersion(db.Model):
+    """Single-row counter bumped by every write that changes what the schedule views show"""
+    __tablename__ = 'schedule_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScheduleVersion {self.version}>'
+
+class Job(db.Model):
+    """A unit of background work picked up by the worker process"""
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    idempotency_key = db.Column(db.String(100), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # percent
+    message = db.Column(db.String(200))
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    worker = db.Column(db.String(100))
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} ({self.status})>'
+
 def initialize_time_off():
     """Initialize time off data from config if database is empty"""
     if TimeOff.query.count() == 0:
@@ -98,7 +156,8 @@ def initialize_time_off():
                     time_off = TimeOff(
                         caregiver_id=caregiver.id,
                         start_date=date,
-                        end_date=date
+                        end_date=date,
+                        status='approved'
                     )
                     db.session.add(time_off)
         db.session.commit() 
\ No newline at end of file
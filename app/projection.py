@@ -0,0 +1,87 @@
+"""Project the weekly pattern onto a date window.
+
+The pattern is resolved to caregiver ids once per weekday, then walked day
+by day as a generator of (date, shift_type, caregiver_id) tuples, skipping
+anyone on approved time off. Nothing is built per day beyond the tuple
+itself, so a full year projects in a few milliseconds and can be handed
+straight to the bulk writer.
+"""
+from .models import db, Caregiver, Shift
+from .availability import AvailabilityIndex
+from .shift_writer import replace_shifts
+from .template_store import get_weekly_pattern
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEEKS = 8
+
+def default_window(today=None):
+    """DEFAULT_WEEKS weeks starting this Monday, as an inclusive (start, end)"""
+    today = today or datetime.now().date()
+    start_date = today - timedelta(days=today.weekday())
+    return start_date, start_date + timedelta(weeks=DEFAULT_WEEKS, days=-1)
+
+class PatternProjection:
+    """A weekly pattern bound to caregiver ids and their approved time off"""
+    def __init__(self, pattern, caregiver_ids, availability=None):
+        self.availability = availability or AvailabilityIndex()
+        self.by_weekday = []  # weekday -> [(shift_type, caregiver_id)]
+        for weekday in range(7):
+            day = []
+            for shift_type, name in pattern.get(weekday, {}).items():
+                if name is None:
+                    continue
+                if name not in caregiver_ids:
+                    raise ValueError(f"Caregiver {name} not found in database")
+                day.append((shift_type, caregiver_ids[name]))
+            self.by_weekday.append(day)
+
+    @classmethod
+    def from_db(cls, start_date, end_date, pattern=None):
+        """Stored template (or the given pattern) with time off for the window"""
+        if pattern is None:
+            pattern = get_weekly_pattern()
+        caregiver_ids = dict(db.session.query(Caregiver.name, Caregiver.id).all())
+        return cls(pattern, caregiver_ids, AvailabilityIndex.build(start_date, end_date))
+
+    def shifts(self, start_date, end_date):
+        """Yield (date, shift_type, caregiver_id) for every day in [start_date, end_date]"""
+        is_off = self.availability.is_off
+        current_date = start_date
+        weekday = start_date.weekday()
+        one_day = timedelta(days=1)
+        while current_date <= end_date:
+            for shift_type, caregiver_id in self.by_weekday[weekday]:
+                if not is_off(caregiver_id, current_date):
+                    yield current_date, shift_type, caregiver_id
+            current_date += one_day
+            weekday = (weekday + 1) % 7
+
+def materialized_until(start_date, end_date):
+    """Last date in the window that already has shifts, or None"""
+    return db.session.query(db.func.max(Shift.date)).filter(
+        Shift.date >= start_date,
+        Shift.date <= end_date
+    ).scalar()
+
+def materialize(start_date, end_date, pattern=None, extend=False):
+    """Write the projected pattern over [start_date, end_date] in one transaction.
+
+    With extend=True only the days after the last existing shift in the
+    window are projected and written, so growing a window never rewrites
+    what is already there. Returns the writer's counts plus the range
+    actually written.
+    """
+    if extend:
+        last = materialized_until(start_date, end_date)
+        if last is not None:
+            start_date = last + timedelta(days=1)
+    if start_date > end_date:
+        return {'deleted': 0, 'inserted': 0, 'start': None, 'end': None}
+
+    projection = PatternProjection.from_db(start_date, end_date, pattern)
+    counts = replace_shifts(start_date, end_date, projection.shifts(start_date, end_date))
+    counts.update(start=start_date.isoformat(), end=end_date.isoformat())
+    return counts
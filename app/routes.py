@@ -1,13 +1,22 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, send_file
+from flask import Blueprint, Response, render_template, request, jsonify, flash, redirect, url_for
 from datetime import datetime, timedelta
 from dateutil.rrule import rrule, DAILY
-from .models import Caregiver, Shift, db, TimeOff
+from .models import Caregiver, Shift, db, TimeOff, Job
 from .config import ShiftConfig, TimeOffConfig
-from .google_calendar import sync_shifts_to_calendar
+from .schedule_repair import repair_schedule
+from .availability import AvailabilityIndex
+from .jobs import enqueue, retry_job, job_to_dict
 import logging
+import os
 import traceback
-from googleapiclient.discovery import build
-from .utils import get_shift, CAREGIVER_COLORS, CAREGIVER_ORDER, update_config_file, sync_db_to_config, sync_config_to_db, ensure_sync, sync_time_off_to_config
+from sqlalchemy.orm import contains_eager
+from .template_store import get_weekly_pattern, set_slot, clear_slot
+from .projection import default_window
+from .cache import cached_view, bump_schedule_version, schedule_state
+from .excel_export import export_schedule, MIMETYPE as EXCEL_MIMETYPE
+from .schedule_api import schedule_page, parse_cursor, DEFAULT_PAGE_WEEKS, MAX_PAGE_WEEKS
+from .ical import build_feed, feed_window, MIMETYPE as ICAL_MIMETYPE
+from .utils import ScheduleMatrix, OccupancyGrid, CAREGIVER_COLORS, CAREGIVER_ORDER
 
 logger = logging.getLogger(__name__)
 views = Blueprint('views', __name__)
@@ -19,41 +28,60 @@ def index():
         return render_template('index.html')
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in index route: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in index route: %s\nTraceback:\n%s", e, error_traceback)
         raise
 
+MAX_CALENDAR_DAYS = 366
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def parse_date_window(default_start, default_days, max_days=MAX_CALENDAR_DAYS):
+    """Read an inclusive start/end window (YYYY-MM-DD) from the query string"""
+    start_arg = request.args.get('start')
+    end_arg = request.args.get('end')
+    start_date = datetime.strptime(start_arg, '%Y-%m-%d').date() if start_arg else default_start
+    if end_arg:
+        end_date = datetime.strptime(end_arg, '%Y-%m-%d').date()
+    else:
+        end_date = start_date + timedelta(days=default_days - 1)
+    if end_date < start_date:
+        raise ValueError("end must not be before start")
+    if max_days is not None and (end_date - start_date).days >= max_days:
+        raise ValueError(f"window is limited to {max_days} days")
+    return start_date, end_date
+
+def is_current_week(date):
+    today = datetime.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    return week_start <= date < week_start + timedelta(days=7)
+
 @views.route('/calendar')
+@cached_view('calendar')
 def calendar_view():
     try:
         logger.debug("Processing calendar view request")
-        
-        # Define the date range for April 7-20, 2025
-        start_date = datetime(2025, 4, 7)  # April 7th, 2025
-        end_date = datetime(2025, 4, 20)   # April 20th, 2025
         today = datetime.now().date()
         
-        # Get all shifts within this date range
-        shifts = Shift.query.filter(
-            Shift.date >= start_date.date(),
-            Shift.date <= end_date.date()
+        # Two weeks from this Monday unless ?start=&end= is given
+        try:
+            start_date, end_date = parse_date_window(today - timedelta(days=today.weekday()), 14)
+        except ValueError as e:
+            return render_template('error.html', error=f"Invalid date window: {e}"), 400
+        
+        # Get all shifts within this date range, grouped by date, with names joined in
+        shift_rows = db.session.query(Shift.date, Shift.shift_type, Caregiver.name).join(
+            Caregiver, Shift.caregiver_id == Caregiver.id
+        ).filter(
+            Shift.date >= start_date,
+            Shift.date <= end_date
         ).order_by(Shift.date, Shift.shift_type).all()
+        shifts_by_date = {}
+        for date, shift_type, name in shift_rows:
+            shifts_by_date.setdefault(date, {})[shift_type] = name
         
-        # Get time off from database
-        time_off_records = TimeOff.query.join(Caregiver).filter(
-            TimeOff.start_date <= end_date.date(),
-            TimeOff.end_date >= start_date.date()
-        ).all()
-        
-        # Create time off dictionary
-        time_off_dict = {}
-        for record in time_off_records:
-            current_date = max(record.start_date, start_date.date())
-            end = min(record.end_date, end_date.date())
-            while current_date <= end:
-                if current_date not in time_off_dict:
-                    time_off_dict[current_date] = []
-                time_off_dict[current_date].append(record.caregiver.name)
-                current_date += timedelta(days=1)
+        # Approved time off in the window, answered per day by bisect
+        availability = AvailabilityIndex.build(start_date, end_date)
+        
+        weekly_pattern = get_weekly_pattern()
         
         # Create a dictionary to store the schedule
         schedule = {}
@@ -61,30 +89,23 @@ def calendar_view():
         # Initialize schedule with all dates in range
         current_date = start_date
         while current_date <= end_date:
-            schedule[current_date] = {
-                'shifts': {},
-                'time_off': time_off_dict.get(current_date.date(), [])
-            }
-            
-            # Get the day of week (0 = Monday, 6 = Sunday)
-            day_of_week = current_date.weekday()
+            day_time_off = availability.names_off_on(current_date)
             
-            # Get the template for this day of week
-            day_template = ShiftConfig.WEEKLY_PATTERN.get(day_of_week, {})
-            
-            # Add shifts from template, skipping caregivers who are off
-            for shift_type, caregiver in day_template.items():
-                if caregiver not in schedule[current_date]['time_off']:
-                    schedule[current_date]['shifts'][shift_type] = caregiver
+            # Shifts from the template for this day of week, skipping caregivers who are off
+            day_template = weekly_pattern.get(current_date.weekday(), {})
+            day_shifts = {shift_type: caregiver for shift_type, caregiver in day_template.items()
+                          if caregiver not in day_time_off}
             
             # Add any overridden shifts from the database
-            for shift in shifts:
-                if shift.date == current_date.date():
-                    schedule[current_date]['shifts'][shift.shift_type] = shift.caregiver.name
+            day_shifts.update(shifts_by_date.get(current_date, {}))
             
+            schedule[current_date] = {
+                'shifts': day_shifts,
+                'time_off': day_time_off
+            }
             current_date += timedelta(days=1)
         
-        logger.debug(f"Generated schedule from {start_date} to {end_date}")
+        logger.debug("Generated schedule from %s to %s", start_date, end_date)
         return render_template('calendar.html', 
                              schedule=schedule,
                              today=today,
@@ -93,10 +114,11 @@ def calendar_view():
                              
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in calendar view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in calendar view: %s\nTraceback:\n%s", e, error_traceback)
         return render_template('error.html', error=str(e)), 500
 
 @views.route('/hourly')
+@cached_view('hourly')
 def hourly_view():
     try:
         logger.debug("Processing hourly view request")
@@ -108,25 +130,26 @@ def hourly_view():
         shifts = Shift.query.filter(
             Shift.date >= start_date,
             Shift.date < start_date + timedelta(days=7)
-        ).join(Caregiver).order_by(Shift.date, Shift.shift_type).all()
+        ).join(Caregiver).options(contains_eager(Shift.caregiver)).order_by(Shift.date, Shift.shift_type).all()
         
-        logger.debug(f"Found {len(shifts)} shifts for the week")
-        return render_template('hourly.html', dates=dates, shifts=shifts)
+        logger.debug("Found %d shifts for the week", len(shifts))
+        return render_template('hourly.html', dates=dates, shifts=shifts,
+                             grid=OccupancyGrid.build(shifts, dates))
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in hourly view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in hourly view: %s\nTraceback:\n%s", e, error_traceback)
         return render_template('error.html', error=str(e)), 500
 
 @views.route('/weekly-template')
 def weekly_template():
     try:
         logger.debug("Processing weekly template request")
-        weekly_pattern = ShiftConfig.WEEKLY_PATTERN
+        weekly_pattern = get_weekly_pattern()
         shift_config = ShiftConfig.SHIFTS
         days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         
-        logger.debug(f"Weekly pattern: {weekly_pattern}")
-        logger.debug(f"Shift config: {shift_config}")
+        logger.debug("Weekly pattern: %s", weekly_pattern)
+        logger.debug("Shift config: %s", shift_config)
         
         return render_template('weekly_template.html', 
                              weekly_pattern=weekly_pattern,
@@ -134,7 +157,7 @@ def weekly_template():
                              days=days)
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in weekly template view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in weekly template view: %s\nTraceback:\n%s", e, error_traceback)
         return render_template('error.html', error=str(e)), 500
 
 @views.route('/caregivers')
@@ -142,7 +165,7 @@ def caregiver_view():
     try:
         logger.debug("Processing caregiver view request")
         caregivers = Caregiver.query.all()
-        logger.debug(f"Found {len(caregivers)} caregivers")
+        logger.debug("Found %d caregivers", len(caregivers))
         
         today = datetime.now().date()
         start_date = today - timedelta(days=today.weekday())  # Start from Monday
@@ -154,7 +177,7 @@ def caregiver_view():
             Shift.date < end_date
         ).order_by(Shift.date, Shift.shift_type).all()
         
-        logger.debug(f"Found {len(shifts)} shifts for the week")
+        logger.debug("Found %d shifts for the week", len(shifts))
         
         # Create a week schedule
         week_dates = list(rrule(DAILY, count=7, dtstart=start_date))
@@ -166,7 +189,7 @@ def caregiver_view():
                              shift_types=ShiftConfig.SHIFTS)
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in caregiver view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in caregiver view: %s\nTraceback:\n%s", e, error_traceback)
         raise
 
 @views.route('/add_shift', methods=['POST'])
@@ -177,7 +200,7 @@ def add_shift():
         shift_type = request.form.get('shift_type')
         date_str = request.form.get('date')
         
-        logger.debug(f"Received request to add shift: caregiver_id={caregiver_id}, shift_type={shift_type}, date={date_str}")
+        logger.debug("Received request to add shift: caregiver_id=%s, shift_type=%s, date=%s", caregiver_id, shift_type, date_str)
         
         if not all([caregiver_id, shift_type, date_str]):
             return jsonify({'error': 'Missing required fields'}), 400
@@ -206,18 +229,18 @@ def add_shift():
         )
         
         db.session.add(new_shift)
-        db.session.commit()
         
-        # Sync the changes to config file
-        if not sync_db_to_config():
-            logger.error("Failed to sync database to config after adding shift")
-            return jsonify({'error': 'Failed to sync changes to config file'}), 500
+        # Edits to the current week update the weekly template in the same transaction
+        if is_current_week(date):
+            set_slot(date.weekday(), shift_type, int(caregiver_id))
+        bump_schedule_version()
+        db.session.commit()
         
         return jsonify({'message': 'Shift added successfully'})
         
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error adding shift: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error adding shift: %s\nTraceback:\n%s", e, error_traceback)
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
@@ -233,19 +256,17 @@ def remove_shift():
         if not shift:
             return jsonify({'error': 'Shift not found'}), 404
             
+        if is_current_week(shift.date):
+            clear_slot(shift.date.weekday(), shift.shift_type)
         db.session.delete(shift)
+        bump_schedule_version()
         db.session.commit()
         
-        # Sync the changes to config file
-        if not sync_db_to_config():
-            logger.error("Failed to sync database to config after removing shift")
-            return jsonify({'error': 'Failed to sync changes to config file'}), 500
-        
         return jsonify({'message': 'Shift removed successfully'})
         
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error removing shift: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error removing shift: %s\nTraceback:\n%s", e, error_traceback)
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
@@ -255,7 +276,7 @@ def manage_caregivers():
         caregivers = Caregiver.query.order_by(Caregiver.id).all()
         return render_template('manage_caregivers.html', caregivers=caregivers)
     except Exception as e:
-        logger.error(f"Error in manage_caregivers route: {e}")
+        logger.error("Error in manage_caregivers route: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # API endpoints for caregiver management
@@ -270,12 +291,13 @@ def add_caregiver():
             
         caregiver = Caregiver(name=name)
         db.session.add(caregiver)
+        bump_schedule_version()
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Caregiver added successfully'})
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error adding caregiver: {e}")
+        logger.error("Error adding caregiver: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @views.route('/api/caregivers/<int:caregiver_id>', methods=['PUT'])
@@ -289,12 +311,13 @@ def update_caregiver(caregiver_id):
             
         caregiver = Caregiver.query.get_or_404(caregiver_id)
         caregiver.name = name
+        bump_schedule_version()
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Caregiver updated successfully'})
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error updating caregiver: {e}")
+        logger.error("Error updating caregiver: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @views.route('/api/caregivers/<int:caregiver_id>', methods=['DELETE'])
@@ -307,15 +330,17 @@ def delete_caregiver(caregiver_id):
             return jsonify({'success': False, 'message': 'Cannot delete caregiver with assigned shifts'}), 400
             
         db.session.delete(caregiver)
+        bump_schedule_version()
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Caregiver deleted successfully'})
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error deleting caregiver: {e}")
+        logger.error("Error deleting caregiver: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @views.route('/grant')
+@cached_view('grant')
 def grant_view():
     try:
         logger.debug("Processing grant view request")
@@ -327,205 +352,57 @@ def grant_view():
         shifts = Shift.query.filter(
             Shift.date >= start_date,
             Shift.date < start_date + timedelta(days=7)
-        ).join(Caregiver).order_by(Shift.date, Shift.shift_type).all()
+        ).join(Caregiver).options(contains_eager(Shift.caregiver)).order_by(Shift.date, Shift.shift_type).all()
         
-        logger.debug(f"Found {len(shifts)} shifts for the week")
-        return render_template('grant.html', dates=dates, shifts=shifts)
+        logger.debug("Found %d shifts for the week", len(shifts))
+        return render_template('grant.html', dates=dates, shifts=shifts,
+                             grid=OccupancyGrid.build(shifts, dates))
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in grant view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in grant view: %s\nTraceback:\n%s", e, error_traceback)
         return render_template('error.html', error=str(e)), 500
 
-def generate_shifts_for_date_range(start_date, end_date):
-    """Generate shifts for the given date range."""
-    try:
-        # Get all caregivers
-        caregivers = Caregiver.query.all()
-        if not caregivers:
-            raise ValueError("No caregivers found in the system")
-            
-        # Delete existing shifts in the date range
-        Shift.query.filter(
-            Shift.date >= start_date,
-            Shift.date <= end_date
-        ).delete()
-        
-        # Get all dates in the range
-        current_date = start_date
-        while current_date <= end_date:
-            used_caregivers_today = set()
-            caregiver_index = 0
-            
-            # Assign A shift (1 caregiver)
-            new_shift = Shift(
-                date=current_date.date(),
-                shift_type='A',
-                caregiver_id=caregivers[caregiver_index].id
-            )
-            db.session.add(new_shift)
-            used_caregivers_today.add(caregivers[caregiver_index].id)
-            caregiver_index = (caregiver_index + 1) % len(caregivers)
-            
-            # Assign G shifts (2 caregivers - G1 and G2)
-            for g_type in ['G1', 'G2']:
-                while caregivers[caregiver_index].id in used_caregivers_today:
-                    caregiver_index = (caregiver_index + 1) % len(caregivers)
-                new_shift = Shift(
-                    date=current_date.date(),
-                    shift_type=g_type,
-                    caregiver_id=caregivers[caregiver_index].id
-                )
-                db.session.add(new_shift)
-                used_caregivers_today.add(caregivers[caregiver_index].id)
-                caregiver_index = (caregiver_index + 1) % len(caregivers)
-            
-            # Assign B shift (2 caregivers, except Saturday)
-            if current_date.weekday() != 5:  # Not Saturday
-                for b_num in range(2):
-                    while caregivers[caregiver_index].id in used_caregivers_today:
-                        caregiver_index = (caregiver_index + 1) % len(caregivers)
-                    new_shift = Shift(
-                        date=current_date.date(),
-                        shift_type='B',
-                        caregiver_id=caregivers[caregiver_index].id
-                    )
-                    db.session.add(new_shift)
-                    used_caregivers_today.add(caregivers[caregiver_index].id)
-                    caregiver_index = (caregiver_index + 1) % len(caregivers)
-            
-            # Assign C shift (1 caregiver)
-            while caregivers[caregiver_index].id in used_caregivers_today:
-                caregiver_index = (caregiver_index + 1) % len(caregivers)
-            new_shift = Shift(
-                date=current_date.date(),
-                shift_type='C',
-                caregiver_id=caregivers[caregiver_index].id
-            )
-            db.session.add(new_shift)
-            
-            current_date += timedelta(days=1)
-        
-        db.session.commit()
-        return True
-        
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error generating shifts: {e}")
-        raise
-
 @views.route('/fill-schedule', methods=['POST'])
 def fill_schedule():
     try:
-        logger.debug("Starting schedule fill operation")
-        # Use the pattern from config
-        weekly_pattern = ShiftConfig.WEEKLY_PATTERN
-
-        # Get all caregivers to map names to IDs
-        caregivers = {c.name: c.id for c in Caregiver.query.all()}
-        logger.debug(f"Found caregivers: {list(caregivers.keys())}")
-        
-        # Delete existing shifts from April 7th onwards
-        schedule_start = datetime(2025, 4, 7)  # Monday
-        schedule_end = datetime(2025, 5, 31)  # Saturday
-        
-        deleted_count = Shift.query.filter(
-            Shift.date >= schedule_start.date(),
-            Shift.date <= schedule_end.date()
-        ).delete()
-        logger.debug(f"Deleted {deleted_count} existing shifts")
-
-        # Function to create shifts for a date range
-        def create_shifts_for_range(start_date, end_date):
-            current_date = start_date
-            shifts_created = 0
-            
-            while current_date <= end_date:
-                # Get the day pattern based on weekday (0 = Monday, 6 = Sunday)
-                day_pattern = weekly_pattern[current_date.weekday()]
-                logger.debug(f"Creating shifts for {current_date.date()}, pattern: {day_pattern}")
-                
-                for shift_type, caregiver_name in day_pattern.items():
-                    # Skip if no caregiver assigned (None)
-                    if caregiver_name is None:
-                        continue
-                    
-                    # Skip Amanda's shifts during her time off
-                    if (caregiver_name == 'Amanda' and 
-                        datetime(2025, 4, 28) <= current_date <= datetime(2025, 5, 2)):
-                        logger.debug(f"Skipping shift for Amanda's time off on {current_date.date()}")
-                        continue
-                    
-                    if caregiver_name not in caregivers:
-                        raise ValueError(f"Caregiver {caregiver_name} not found in database")
-                    
-                    new_shift = Shift(
-                        date=current_date.date(),
-                        shift_type=shift_type,
-                        caregiver_id=caregivers[caregiver_name]
-                    )
-                    db.session.add(new_shift)
-                    shifts_created += 1
-                    logger.debug(f"Created {shift_type} shift for {caregiver_name} on {current_date.date()}")
-                
-                current_date += timedelta(days=1)
-            
-            return shifts_created
-
-        # Create shifts for April (7th-30th)
-        april_shifts = create_shifts_for_range(schedule_start, datetime(2025, 4, 30))
-        logger.debug(f"Created {april_shifts} shifts for April")
-        
-        # Create shifts for May (entire month including May 31st)
-        may_start = datetime(2025, 5, 1)
-        may_shifts = create_shifts_for_range(may_start, schedule_end)
-        logger.debug(f"Created {may_shifts} shifts for May (including May 31st)")
-        
-        db.session.commit()
-        total_shifts = april_shifts + may_shifts
-        logger.debug(f"Successfully created total of {total_shifts} shifts")
-        
-        # Double check May 31st shifts were created
-        may_31_shifts = Shift.query.filter(
-            Shift.date == datetime(2025, 5, 31).date()
-        ).all()
-        logger.debug(f"May 31st shifts created: {[f'{s.shift_type}:{s.caregiver.name}' for s in may_31_shifts]}")
-        
-        return jsonify({
-            'success': True, 
-            'message': f'Schedule filled successfully with {total_shifts} shifts'
-        })
-        
+        params = window_params()
+        if request.args.get('extend') or (request.get_json(silent=True) or {}).get('extend'):
+            params['extend'] = True
+        return enqueue_job_response('fill_schedule', 'Schedule fill queued', params)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid date window: {e}'}), 400
     except Exception as e:
         db.session.rollback()
-        error_msg = str(e)
-        logger.error(f"Error filling schedule: {error_msg}")
+        logger.error("Error queueing schedule fill: %s", e)
         return jsonify({
             'success': False, 
-            'message': f'Error filling schedule: {error_msg}'
+            'message': f'Error filling schedule: {str(e)}'
         }), 500
 
 @views.route('/caregiver-schedule/<caregiver_name>')
+@cached_view('caregiver_schedule')
 def caregiver_schedule(caregiver_name):
     try:
-        logger.debug(f"Retrieving schedule for caregiver: {caregiver_name}")
+        logger.debug("Retrieving schedule for caregiver: %s", caregiver_name)
         # Get the caregiver
         caregiver = Caregiver.query.filter_by(name=caregiver_name).first_or_404()
-        logger.debug(f"Found caregiver with ID: {caregiver.id}")
+        logger.debug("Found caregiver with ID: %s", caregiver.id)
         
-        # Get all shifts for April-May 2025
-        start_date = datetime(2025, 4, 7)  # Schedule starts from April 7th
-        end_date = datetime(2025, 5, 31, 23, 59, 59)  # Include full last day
+        # The default fill window unless ?start=&end= is given
+        default_start, default_end = default_window()
+        try:
+            start_date, end_date = parse_date_window(default_start, (default_end - default_start).days + 1)
+        except ValueError as e:
+            return render_template('error.html', error=f"Invalid date window: {e}"), 400
         
         # Get shifts ordered by date
         shifts = Shift.query.filter(
             Shift.caregiver_id == caregiver.id,
-            Shift.date >= start_date.date(),
-            Shift.date <= end_date.date()
+            Shift.date >= start_date,
+            Shift.date <= end_date
         ).order_by(Shift.date).all()  # Removed shift_type from order_by to ensure proper date ordering
         
-        logger.debug(f"Found {len(shifts)} shifts for {caregiver_name}")
-        for shift in shifts:
-            logger.debug(f"Shift on {shift.date}: {shift.shift_type} ({shift.start_hour}:00-{shift.end_hour}:00)")
+        logger.debug("Found %d shifts for %s", len(shifts), caregiver_name)
         
         # Sort shifts by date and start hour after fetching
         shifts.sort(key=lambda x: (x.date, x.start_hour))
@@ -544,8 +421,8 @@ def caregiver_schedule(caregiver_name):
             weekly_hours[monday] += shift.duration_hours
             total_hours += shift.duration_hours
             
-        logger.debug(f"Weekly hours for {caregiver_name}: {weekly_hours}")
-        logger.debug(f"Total hours for {caregiver_name}: {total_hours}")
+        logger.debug("Weekly hours for %s: %s", caregiver_name, weekly_hours)
+        logger.debug("Total hours for %s: %s", caregiver_name, total_hours)
         
         # Group shifts by month for easy display
         shifts_by_month = {}
@@ -559,10 +436,6 @@ def caregiver_schedule(caregiver_name):
         for month_shifts in shifts_by_month.values():
             month_shifts.sort(key=lambda x: (x.date, x.start_hour))
         
-        # Verify if May 31st shifts are included
-        may_31_shifts = [s for s in shifts if s.date == datetime(2025, 5, 31).date()]
-        logger.debug(f"May 31st shifts for {caregiver_name}: {len(may_31_shifts)}")
-        
         return render_template(
             'caregiver_schedule.html',
             caregiver=caregiver,
@@ -573,12 +446,48 @@ def caregiver_schedule(caregiver_name):
         
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in caregiver schedule view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in caregiver schedule view: %s\nTraceback:\n%s", e, error_traceback)
         return render_template('error.html', error=str(e)), 500
 
+def ical_response(title, caregiver_id=None):
+    """A .ics feed over ?start=&end= (default: four weeks back to six months ahead)"""
+    default_start, default_end = feed_window()
+    try:
+        start_date, end_date = parse_date_window(default_start, (default_end - default_start).days + 1)
+    except ValueError as e:
+        return Response(f"Invalid date window: {e}\n", status=400, mimetype='text/plain')
+    _, updated_at = schedule_state()
+    return Response(build_feed(title, start_date, end_date, caregiver_id, stamp=updated_at),
+                    mimetype=ICAL_MIMETYPE)
+
+@views.route('/ical/all.ics')
+@cached_view('ical_house')
+def house_ical():
+    """Every caregiver's shifts, for a house calendar subscription"""
+    try:
+        return ical_response('Group Home Schedule')
+    except Exception as e:
+        logger.error("Error building house calendar feed: %s", e)
+        return Response("Error building calendar feed\n", status=500, mimetype='text/plain')
+
+@views.route('/ical/<caregiver_name>.ics')
+@cached_view('ical_caregiver')
+def caregiver_ical(caregiver_name):
+    """One caregiver's shifts, for subscribing from a phone calendar"""
+    try:
+        caregiver = Caregiver.query.filter_by(name=caregiver_name).first()
+        if caregiver is None:
+            return Response("Caregiver not found\n", status=404, mimetype='text/plain')
+        return ical_response(f"{caregiver.name} - Shifts", caregiver.id)
+    except Exception as e:
+        logger.error("Error building calendar feed for %s: %s", caregiver_name, e)
+        return Response("Error building calendar feed\n", status=500, mimetype='text/plain')
+
 @views.route('/test-calendar-connection', methods=['GET'])
 def test_calendar_connection():
     try:
+        # The Google client stack is heavy; only load it when a calendar route runs
+        from .google_calendar import get_calendar_service
         service = get_calendar_service()
         # Try to get calendar list as a simple test
         calendar_list = service.calendarList().list().execute()
@@ -591,7 +500,7 @@ def test_calendar_connection():
         
     except Exception as e:
         error_msg = str(e)
-        logger.error(f"Error testing calendar connection: {error_msg}")
+        logger.error("Error testing calendar connection: %s", error_msg)
         return jsonify({
             'success': False,
             'message': f'Error connecting to Google Calendar: {error_msg}'
@@ -600,117 +509,75 @@ def test_calendar_connection():
 @views.route('/sync-to-calendar', methods=['POST'])
 def sync_to_calendar():
     try:
-        logger.debug("Starting Google Calendar sync")
-        
-        # Get shifts for April-May 2025
-        start_date = datetime(2025, 4, 7)  # Schedule starts from April 7th
-        end_date = datetime(2025, 5, 31)  # Include May 31st
-        
-        shifts = Shift.query.filter(
-            Shift.date >= start_date.date(),
-            Shift.date <= end_date.date()
-        ).order_by(Shift.date).all()
-        
-        logger.debug(f"Found {len(shifts)} shifts to sync")
-        
-        if not shifts:
-            return jsonify({
-                'success': False,
-                'message': 'No shifts found to sync'
-            }), 400
-        
-        # Log some sample shifts for debugging
-        sample_shifts = shifts[:3]
-        for shift in sample_shifts:
-            logger.debug(f"Sample shift: Date={shift.date}, Type={shift.shift_type}, "
-                       f"Caregiver={shift.caregiver.name}")
-        
-        # Sync shifts to Google Calendar
-        sync_shifts_to_calendar(shifts)
-        
-        return jsonify({
-            'success': True,
-            'message': f'Successfully synced {len(shifts)} shifts to Google Calendar'
-        })
-        
+        return enqueue_job_response('sync_calendar', 'Google Calendar sync queued', window_params())
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid date window: {e}'}), 400
     except Exception as e:
+        db.session.rollback()
         error_msg = str(e)
-        logger.error(f"Error syncing to Google Calendar: {error_msg}")
+        logger.error("Error queueing Google Calendar sync: %s", error_msg)
         return jsonify({
             'success': False,
             'message': f'Error syncing to Google Calendar: {error_msg}'
         }), 500
 
 @views.route('/printable-schedule')
+@cached_view('printable')
 def printable_schedule():
     """Display printable schedule view with hourly breakdown"""
     try:
-        # Fixed date range: April 7-20, 2025
-        start_date = datetime(2025, 4, 7).date()
-        dates = [(datetime(2025, 4, 7) + timedelta(days=i)).date() for i in range(14)]
+        # Two weeks from this Monday unless ?start=&end= is given
+        today = datetime.now().date()
+        try:
+            start_date, end_date = parse_date_window(today - timedelta(days=today.weekday()), 14)
+        except ValueError as e:
+            return render_template('error.html', error=f"Invalid date window: {e}"), 400
+        dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+        # For Excel download
+        if request.args.get('format') == 'excel':
+            return generate_excel_schedule(start_date, end_date)
 
-        # Get shifts for the week
-        shifts = Shift.query.join(Caregiver).filter(
+        # Get shifts for the week, with caregivers loaded in the same query
+        shifts = Shift.query.join(Caregiver).options(contains_eager(Shift.caregiver)).filter(
             Shift.date >= dates[0],
             Shift.date <= dates[-1]
         ).order_by(Shift.date, Shift.shift_type).all()
-
-        # For Excel download
-        if request.args.get('format') == 'excel':
-            return generate_excel_schedule(shifts, dates)
             
-        # Get time off from database
-        time_off_schedule = TimeOff.get_all_time_off()
+        # Shift and time off lookups for every (date, caregiver) cell
+        schedule = ScheduleMatrix.build(dates[0], dates[-1])
         
         return render_template('printable_schedule.html',
                              shifts=shifts,
                              dates=dates,
                              caregiver_colors=CAREGIVER_COLORS,
                              caregiver_order=CAREGIVER_ORDER,
-                             get_shift=get_shift,
-                             TIME_OFF=time_off_schedule,
+                             schedule=schedule,
+                             grid=OccupancyGrid.build(shifts, dates),
                              shift_config=ShiftConfig.SHIFTS)
     except Exception as e:
-        logger.error(f"Error generating printable schedule: {e}")
+        logger.error("Error generating printable schedule: %s", e)
         flash('Error generating schedule', 'error')
         return redirect(url_for('views.calendar_view'))
 
-def generate_excel_schedule(shifts, dates):
-    """Generate Excel file of the schedule"""
-    import xlsxwriter
-    from io import BytesIO
-    
-    output = BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet()
-    
-    # Add headers and formatting
-    header_format = workbook.add_format({
-        'bold': True,
-        'align': 'center',
-        'bg_color': '#D3D3D3'
-    })
-    
-    # Write headers
-    worksheet.write(0, 0, 'Time', header_format)
-    for i, date in enumerate(dates):
-        worksheet.write(0, i+1, date.strftime('%A (%m/%d)'), header_format)
-    
-    # Write time slots
-    for hour in range(24):
-        row = hour + 1
-        time_str = f"{hour:02d}:00"
-        worksheet.write(row, 0, time_str)
-    
-    workbook.close()
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name='schedule.xlsx'
-    )
+def generate_excel_schedule(start_date, end_date):
+    """Stream the hourly schedule as .xlsx, one sheet per week, from a temporary file"""
+    path = export_schedule(start_date, end_date)
+
+    def chunks():
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    response = Response(chunks(), mimetype=EXCEL_MIMETYPE)
+    response.headers['Content-Length'] = str(os.path.getsize(path))
+    response.headers['Content-Disposition'] = f'attachment; filename=schedule-{start_date}-to-{end_date}.xlsx'
+    # Remove the file once the response is closed, whether or not it was read to the end
+    response.call_on_close(lambda: os.path.exists(path) and os.remove(path))
+    return response
 
 @views.route('/time-off')
 def time_off_management():
@@ -721,7 +588,7 @@ def time_off_management():
                             caregivers=caregivers,
                             time_off_requests=time_off_requests)
     except Exception as e:
-        logger.error(f"Error in time off management: {e}")
+        logger.error("Error in time off management: %s", e)
         return render_template('error.html', error=str(e)), 500
 
 @views.route('/api/time-off', methods=['POST'])
@@ -775,9 +642,21 @@ def update_time_off_status(time_off_id, action):
         time_off = TimeOff.query.get_or_404(time_off_id)
         time_off.status = 'approved' if action == 'approve' else 'rejected'
         time_off.updated_at = datetime.utcnow()
-        
+        bump_schedule_version()
+
+        # Cover the caregiver's shifts in the approved range, touching only those rows.
+        # The approval and the repair commit together, so a failed repair approves nothing.
+        changes = {'changed': [], 'unfilled': []}
+        if action == 'approve':
+            changes = repair_schedule(time_off.caregiver_id, time_off.start_date, time_off.end_date,
+                                      commit=False)
         db.session.commit()
-        return jsonify({'success': True, 'message': f'Time off request {action}d successfully'})
+
+        return jsonify({
+            'success': True,
+            'message': f'Time off request {action}d successfully',
+            'changes': changes
+        })
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -787,13 +666,9 @@ def delete_time_off(time_off_id):
     try:
         time_off = TimeOff.query.get_or_404(time_off_id)
         db.session.delete(time_off)
+        bump_schedule_version()
         db.session.commit()
         
-        # Sync the changes to config file
-        if not sync_time_off_to_config():
-            logger.error("Failed to sync time off to config after deletion")
-            return jsonify({'success': False, 'message': 'Failed to sync changes to config file'}), 500
-            
         return jsonify({'success': True, 'message': 'Time off deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -802,30 +677,107 @@ def delete_time_off(time_off_id):
 @views.route('/api/sync-config', methods=['POST'])
 def sync_config():
     try:
-        # Ensure both database and config are in sync
-        if ensure_sync():
-            return jsonify({
-                'success': True,
-                'message': 'Successfully synced database and config'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to sync database and config'
-            }), 500
-            
+        return enqueue_job_response('sync_config', 'Weekly template sync queued')
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'message': str(e)
         }), 500
 
+def window_params():
+    """Optional start/end (YYYY-MM-DD) from the JSON body or query string, validated"""
+    data = request.get_json(silent=True) or {}
+    params = {}
+    for key in ('start', 'end'):
+        value = data.get(key) or request.args.get(key)
+        if value:
+            params[key] = datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    if 'start' in params and 'end' in params and params['end'] < params['start']:
+        raise ValueError("end must not be before start")
+    return params
+
+def enqueue_job_response(kind, message, params=None):
+    """Queue a background job and answer 202 with a handle to poll.
+
+    An Idempotency-Key header makes retried requests return the same job.
+    """
+    job, created = enqueue(kind, params, idempotency_key=request.headers.get('Idempotency-Key'))
+    return jsonify({
+        'success': True,
+        'message': message if created else 'Already queued',
+        'job': job_to_dict(job),
+        'status_url': url_for('views.job_status', job_id=job.id)
+    }), 202
+
+@views.route('/api/schedule')
+@cached_view('api_schedule')
+def schedule_api():
+    """Shifts as parallel arrays, paged by week.
+
+    ?start=&end= pick the window (default: two weeks from this Monday, no
+    upper limit since it is paged), ?caregiver= a name or id, ?weeks= the
+    page size, ?time_off=1 adds approved time off. Follow next_cursor with
+    ?cursor= until it is null.
+    """
+    try:
+        today = datetime.now().date()
+        start_date, end_date = parse_date_window(today - timedelta(days=today.weekday()), 14, max_days=None)
+        page_start = parse_cursor(request.args.get('cursor'), start_date, end_date)
+        weeks = int(request.args.get('weeks', DEFAULT_PAGE_WEEKS))
+        if not 1 <= weeks <= MAX_PAGE_WEEKS:
+            raise ValueError(f"weeks must be between 1 and {MAX_PAGE_WEEKS}")
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid request: {e}'}), 400
+
+    try:
+        caregiver_id = None
+        caregiver_arg = request.args.get('caregiver')
+        if caregiver_arg:
+            caregiver = (Caregiver.query.get(int(caregiver_arg)) if caregiver_arg.isdigit()
+                         else Caregiver.query.filter_by(name=caregiver_arg).first())
+            if caregiver is None:
+                return jsonify({'success': False, 'message': 'Caregiver not found'}), 404
+            caregiver_id = caregiver.id
+
+        payload = schedule_page(start_date, end_date, page_start, weeks, caregiver_id,
+                                include_time_off=request.args.get('time_off') in ('1', 'true'))
+        payload['success'] = True
+        return jsonify(payload)
+    except Exception as e:
+        logger.error("Error in schedule API: %s", e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@views.route('/api/jobs/<int:job_id>')
+def job_status(job_id):
+    job = Job.query.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job_to_dict(job)})
+
+@views.route('/api/jobs/<int:job_id>/retry', methods=['POST'])
+def retry_job_route(job_id):
+    try:
+        job = Job.query.get(job_id)
+        if job is None:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        retry_job(job)
+        return jsonify({
+            'success': True,
+            'job': job_to_dict(job),
+            'status_url': url_for('views.job_status', job_id=job.id)
+        }), 202
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Error retrying job %s: %s", job_id, e)
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @views.route('/admin')
 def admin_view():
     try:
         logger.debug("Processing admin view request")
         caregivers = Caregiver.query.all()
-        logger.debug(f"Found {len(caregivers)} caregivers")
+        logger.debug("Found %d caregivers", len(caregivers))
         
         today = datetime.now().date()
         start_date = today - timedelta(days=today.weekday())  # Start from Monday
@@ -837,7 +789,7 @@ def admin_view():
             Shift.date < end_date
         ).order_by(Shift.date, Shift.shift_type).all()
         
-        logger.debug(f"Found {len(shifts)} shifts for the week")
+        logger.debug("Found %d shifts for the week", len(shifts))
         
         # Create a week schedule
         week_dates = list(rrule(DAILY, count=7, dtstart=start_date))
@@ -848,5 +800,5 @@ def admin_view():
                              shifts=shifts)
     except Exception as e:
         error_traceback = traceback.format_exc()
-        logger.error(f"Error in admin view: {e}\nTraceback:\n{error_traceback}")
+        logger.error("Error in admin view: %s\nTraceback:\n%s", e, error_traceback)
         return render_template('error.html', error=str(e)), 500
@@ -0,0 +1,84 @@
+"""Columnar schedule payloads for /api/schedule.
+
+A page covers whole weeks (Monday to Sunday, clipped to the requested
+window) and is built from one query on the (date, shift_type, slot) or
+(caregiver_id, date) index. Shifts come back as parallel arrays rather
+than one object per shift, with each caregiver's name sent once.
+"""
+from .models import db, Caregiver, Shift, TimeOff
+from datetime import datetime, timedelta
+
+DEFAULT_PAGE_WEEKS = 4
+MAX_PAGE_WEEKS = 12
+
+def parse_cursor(cursor, start_date, end_date):
+    """Page start from a cursor (YYYY-MM-DD), which must fall inside the window"""
+    if not cursor:
+        return start_date
+    page_start = datetime.strptime(cursor, '%Y-%m-%d').date()
+    if not start_date <= page_start <= end_date:
+        raise ValueError("cursor is outside the requested window")
+    return page_start
+
+def page_bounds(page_start, end_date, weeks):
+    """Inclusive end of the page starting at page_start and the next cursor, or None"""
+    # Run to the Sunday weeks - 1 weeks after page_start's week
+    page_end = page_start + timedelta(days=6 - page_start.weekday(), weeks=weeks - 1)
+    if page_end >= end_date:
+        return end_date, None
+    return page_end, page_end + timedelta(days=1)
+
+def schedule_page(start_date, end_date, page_start, weeks=DEFAULT_PAGE_WEEKS, caregiver_id=None,
+                  include_time_off=False):
+    page_end, next_cursor = page_bounds(page_start, end_date, weeks)
+
+    query = db.session.query(Shift.date, Shift.shift_type, Shift.slot, Shift.caregiver_id, Caregiver.name).join(
+        Caregiver, Shift.caregiver_id == Caregiver.id
+    ).filter(
+        Shift.date >= page_start,
+        Shift.date <= page_end
+    )
+    if caregiver_id is not None:
+        query = query.filter(Shift.caregiver_id == caregiver_id)
+
+    dates, shift_types, slots, caregiver_ids = [], [], [], []
+    names = {}
+    for date, shift_type, slot, cid, name in query.order_by(Shift.date, Shift.shift_type, Shift.slot):
+        dates.append(date.isoformat())
+        shift_types.append(shift_type)
+        slots.append(slot)
+        caregiver_ids.append(cid)
+        names[cid] = name
+
+    payload = {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'page': {'start': page_start.isoformat(), 'end': page_end.isoformat()},
+        'next_cursor': next_cursor.isoformat() if next_cursor else None,
+        'caregivers': {str(cid): name for cid, name in names.items()},
+        'shifts': {
+            'date': dates,
+            'shift_type': shift_types,
+            'slot': slots,
+            'caregiver_id': caregiver_ids,
+        },
+    }
+
+    if include_time_off:
+        query = db.session.query(TimeOff.caregiver_id, TimeOff.start_date, TimeOff.end_date, Caregiver.name).join(
+            Caregiver, TimeOff.caregiver_id == Caregiver.id
+        ).filter(
+            TimeOff.status == 'approved',
+            TimeOff.start_date <= page_end,
+            TimeOff.end_date >= page_start
+        )
+        if caregiver_id is not None:
+            query = query.filter(TimeOff.caregiver_id == caregiver_id)
+        rows = query.order_by(TimeOff.start_date).all()
+        payload['time_off'] = {
+            'caregiver_id': [row.caregiver_id for row in rows],
+            'start': [row.start_date.isoformat() for row in rows],
+            'end': [row.end_date.isoformat() for row in rows],
+        }
+        payload['caregivers'].update((str(row.caregiver_id), row.name) for row in rows)
+    return payload
@@ -1,165 +1,617 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from flask import current_app
 from datetime import datetime, timedelta
 from .models import db, Caregiver, Shift
+from .availability import AvailabilityIndex
+from .shift_writer import delete_shifts, insert_shifts
 from . import create_app
-import random
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Shifts to fill each day: (shift type, caregivers needed). No B on Saturday.
+# The two G caregivers work the G1 and G2 hours, as in ShiftConfig.SHIFTS.
+DAILY_DEMAND = [('A', 1), ('G1', 1), ('G2', 1), ('B', 2), ('C', 1)]
 
 class ScheduleConstraints:
     def __init__(self):
         self.shifts_per_week = 5  # Each caregiver works 5 days
         self.hours_per_shift = 8  # Each shift is 8 hours
         self.hours_per_week = 40  # Total weekly hours per caregiver
+        # (shift, next day's shift) pairs one caregiver may not work back to
+        # back: B ends at midnight, exactly when the next day's C starts
+        self.rest_rules = {('B', 'C')}
 
-def get_caregiver_weekly_shifts(caregiver, start_date, end_date):
-    return Shift.query.filter(
-        Shift.caregiver_id == caregiver.id,
-        Shift.date >= start_date,
-        Shift.date < end_date
-    ).count()
+class ShiftLedger:
+    """In-memory view of the shifts in a generation window.
 
-def get_least_scheduled_caregivers(caregivers, used_today, start_date, end_date, count=1):
-    available = []
-    shift_counts = {}
-    
-    for cg in caregivers:
-        if cg.id not in used_today:
-            shifts = get_caregiver_weekly_shifts(cg, start_date, end_date)
-            shift_counts[cg] = shifts
-            if shifts < 5:  # Max 5 shifts per week
-                available.append(cg)
-    
-    # Sort by number of shifts (least to most)
-    available.sort(key=lambda x: shift_counts[x])
-    return available[:count] if count > 1 else available[0] if available else None
+    Loads the window once, tracks per-caregiver/per-week counts as
+    assignments are made and writes the new assignments in one bulk insert,
+    so generation does not issue a COUNT query per candidate. The day before
+    the window is loaded too, so rest rules hold across the boundary.
 
-def generate_schedule(start_date, num_weeks=1):
-    # Clear existing shifts
-    Shift.query.delete()
-    db.session.commit()
+    Alongside the counts, every caregiver gets a bit position and the ledger
+    keeps integer bitmasks of who works each day and each shift type, and
+    of who sits at each weekly and total load level. Candidate filtering
+    ("free today, under the cap, rested, not off") is then a handful of
+    AND/OR operations instead of a loop over caregivers.
+    """
+    def __init__(self, start_date, num_weeks=1):
+        self.start_date = start_date
+        self.end_date = start_date + timedelta(weeks=num_weeks)
+        self.weekly_counts = defaultdict(int)  # (caregiver_id, week) -> shifts
+        self.total_counts = defaultdict(int)  # caregiver_id -> shifts in the window
+        self.daily_shifts = defaultdict(dict)  # date -> {caregiver_id: shift_type}
+        self.slot_counts = defaultdict(int)  # (date, shift_type) -> shifts
+        self.taken_slots = defaultdict(set)  # (date, shift_type) -> slot numbers in use
+        self.double_booked = 0
+        self.pending = []
+        self.bits = {}  # caregiver_id -> bit position
+        self.ids_by_bit = []
+        self.day_masks = defaultdict(int)  # date -> caregivers working
+        self.type_masks = defaultdict(int)  # (date, shift_type) -> caregivers on it
+        self.week_levels = defaultdict(dict)  # week -> {shifts: caregivers}, shifts >= 1
+        self.total_levels = {}  # shifts in the window -> caregivers, shifts >= 1
 
-    constraints = ScheduleConstraints()
-    caregivers = Caregiver.query.all()
-    current_date = start_date
-    end_date = start_date + timedelta(days=7)
+    def week_of(self, date):
+        return (date - self.start_date).days // 7
 
-    # Pre-calculate required shifts for the week
-    total_shifts = {
-        'A': 7,   # 1 per day * 7 days
-        'B': 12,  # 2 per day * 6 days (no Saturday)
-        'C': 7,   # 1 per day * 7 days
-        'G': 14   # 2 per day * 7 days
-    }
+    def load(self, rows=None):
+        """Load the existing shifts in the window with a single query.
 
-    for day in range(7):
-        used_caregivers_today = set()
-        
-        # Assign A shift (1 caregiver)
-        cg = get_least_scheduled_caregivers(caregivers, used_caregivers_today, start_date, end_date)
-        if cg:
-            used_caregivers_today.add(cg.id)
-            shift = Shift(date=current_date, shift_type='A', caregiver=cg)
-            db.session.add(shift)
-
-        # Assign G shift (2 caregivers)
-        for _ in range(2):
-            cg = get_least_scheduled_caregivers(caregivers, used_caregivers_today, start_date, end_date)
-            if cg:
-                used_caregivers_today.add(cg.id)
-                shift = Shift(date=current_date, shift_type='G', caregiver=cg)
-                db.session.add(shift)
-
-        # Assign B shift (2 caregivers, except Saturday)
-        if current_date.weekday() != 5:  # Not Saturday
-            for _ in range(2):
-                cg = get_least_scheduled_caregivers(caregivers, used_caregivers_today, start_date, end_date)
-                if cg:
-                    used_caregivers_today.add(cg.id)
-                    shift = Shift(date=current_date, shift_type='B', caregiver=cg)
-                    db.session.add(shift)
-
-        # Assign C shift (1 caregiver)
-        cg = get_least_scheduled_caregivers(caregivers, used_caregivers_today, start_date, end_date)
-        if cg:
-            used_caregivers_today.add(cg.id)
-            shift = Shift(date=current_date, shift_type='C', caregiver=cg)
-            db.session.add(shift)
+        rows may be passed in as (date, shift_type, caregiver_id, slot) tuples
+        instead; rows outside the window only feed the rest rules.
+        """
+        if rows is None:
+            rows = db.session.query(Shift.date, Shift.shift_type, Shift.caregiver_id, Shift.slot).filter(
+                Shift.date >= self.start_date - timedelta(days=1),
+                Shift.date < self.end_date
+            ).all()
+        for date, shift_type, caregiver_id, slot in rows:
+            if date < self.start_date or date >= self.end_date:
+                self.daily_shifts[date][caregiver_id] = shift_type
+                self._mark(date, shift_type, 1 << self._bit(caregiver_id))
+            else:
+                self._record(date, shift_type, caregiver_id)
+                self.taken_slots[(date, shift_type)].add(slot)
+        return self
 
-        current_date += timedelta(days=1)
-        db.session.commit()  # Commit after each day to maintain consistency
+    def _bit(self, caregiver_id):
+        bit = self.bits.get(caregiver_id)
+        if bit is None:
+            bit = self.bits[caregiver_id] = len(self.ids_by_bit)
+            self.ids_by_bit.append(caregiver_id)
+        return bit
+
+    def mask_of(self, caregiver_ids):
+        mask = 0
+        for caregiver_id in caregiver_ids:
+            mask |= 1 << self._bit(caregiver_id)
+        return mask
+
+    def register(self, caregiver_ids):
+        """Put caregiver_ids first in bit order and return their mask.
+
+        Bit order breaks ties between equally loaded caregivers, so this
+        keeps picks in caregiver list order even after load().
+        """
+        order = list(dict.fromkeys(list(caregiver_ids) + self.ids_by_bit))
+        if order[:len(self.ids_by_bit)] != self.ids_by_bit:
+            self.bits = {}
+            self.ids_by_bit = []
+            self._rebuild_masks(order)
+        return self.mask_of(caregiver_ids)
+
+    def _rebuild_masks(self, order):
+        for caregiver_id in order:
+            self._bit(caregiver_id)
+        self.day_masks.clear()
+        self.type_masks.clear()
+        self.week_levels.clear()
+        self.total_levels = {}
+        for date, shifts in self.daily_shifts.items():
+            for caregiver_id, shift_type in shifts.items():
+                self._mark(date, shift_type, 1 << self._bit(caregiver_id))
+        for (caregiver_id, week), count in self.weekly_counts.items():
+            self._move_level(self.week_levels[week], 0, count, 1 << self._bit(caregiver_id))
+        for caregiver_id, count in self.total_counts.items():
+            self._move_level(self.total_levels, 0, count, 1 << self._bit(caregiver_id))
+
+    def _mark(self, date, shift_type, bit):
+        self.day_masks[date] |= bit
+        self.type_masks[(date, shift_type)] |= bit
+
+    @staticmethod
+    def _move_level(levels, old, new, bit):
+        if old > 0:
+            levels[old] &= ~bit
+            if not levels[old]:
+                del levels[old]
+        if new > 0:
+            levels[new] = levels.get(new, 0) | bit
+
+    def _record(self, date, shift_type, caregiver_id):
+        week = self.week_of(date)
+        bit = 1 << self._bit(caregiver_id)
+        count = self.weekly_counts[(caregiver_id, week)]
+        self._move_level(self.week_levels[week], count, count + 1, bit)
+        self._move_level(self.total_levels, self.total_counts[caregiver_id],
+                         self.total_counts[caregiver_id] + 1, bit)
+        self.weekly_counts[(caregiver_id, week)] += 1
+        self.total_counts[caregiver_id] += 1
+        if caregiver_id in self.daily_shifts[date]:
+            self.double_booked += 1
+        self.daily_shifts[date][caregiver_id] = shift_type
+        self.slot_counts[(date, shift_type)] += 1
+        self._mark(date, shift_type, bit)
+
+    def _unrecord(self, date, shift_type, caregiver_id):
+        week = self.week_of(date)
+        bit = 1 << self._bit(caregiver_id)
+        count = self.weekly_counts[(caregiver_id, week)]
+        self._move_level(self.week_levels[week], count, count - 1, bit)
+        self._move_level(self.total_levels, self.total_counts[caregiver_id],
+                         self.total_counts[caregiver_id] - 1, bit)
+        self.weekly_counts[(caregiver_id, week)] -= 1
+        self.total_counts[caregiver_id] -= 1
+        self.daily_shifts[date].pop(caregiver_id, None)
+        self.slot_counts[(date, shift_type)] -= 1
+        self.day_masks[date] &= ~bit
+        self.type_masks[(date, shift_type)] &= ~bit
+
+    def move(self, date, shift_type, from_id, to_id):
+        """Reassign an already written shift; nothing is queued for flush"""
+        self._unrecord(date, shift_type, from_id)
+        self._record(date, shift_type, to_id)
+
+    def weekly_shifts(self, caregiver_id, date):
+        return self.weekly_counts[(caregiver_id, self.week_of(date))]
+
+    def total_shifts(self, caregiver_id):
+        return self.total_counts[caregiver_id]
+
+    def working_on(self, date):
+        return self.daily_shifts[date]
+
+    def rest_blocked(self, date, shift_type, rest_rules):
+        """Caregivers a rest rule keeps off shift_type on date"""
+        blocked = set()
+        for caregiver_id, prev_type in self.daily_shifts.get(date - timedelta(days=1), {}).items():
+            if (prev_type, shift_type) in rest_rules:
+                blocked.add(caregiver_id)
+        for caregiver_id, next_type in self.daily_shifts.get(date + timedelta(days=1), {}).items():
+            if (shift_type, next_type) in rest_rules:
+                blocked.add(caregiver_id)
+        return blocked
+
+    def rest_mask(self, date, shift_type, rest_rules):
+        """Bitmask version of rest_blocked"""
+        mask = 0
+        for before, after in rest_rules:
+            if after == shift_type:
+                mask |= self.type_masks.get((date - timedelta(days=1), before), 0)
+            if before == shift_type:
+                mask |= self.type_masks.get((date + timedelta(days=1), after), 0)
+        return mask
+
+    def capped_mask(self, date, cap):
+        """Caregivers already at or over cap shifts in date's week"""
+        mask = 0
+        for count, level in self.week_levels.get(self.week_of(date), {}).items():
+            if count >= cap:
+                mask |= level
+        return mask
+
+    def free_mask(self, date, shift_type, pool, rest_rules, cap):
+        """Caregivers in pool who can take shift_type on date: not working that
+        day, under the weekly cap and not blocked by a rest rule"""
+        return pool & ~(self.day_masks.get(date, 0) |
+                        self.capped_mask(date, cap) |
+                        self.rest_mask(date, shift_type, rest_rules))
+
+    def least_loaded(self, mask, date):
+        """Caregiver in mask with the fewest shifts in date's week, then in the
+        window, then lowest bit; None if mask is empty"""
+        if not mask:
+            return None
+        levels = self.week_levels.get(self.week_of(date), {})
+        candidates = self._lowest_level(mask, levels)
+        candidates = self._lowest_level(candidates, self.total_levels)
+        return self.ids_by_bit[(candidates & -candidates).bit_length() - 1]
+
+    @staticmethod
+    def _lowest_level(mask, levels):
+        # Anyone in mask on no level has zero shifts
+        loaded = 0
+        for level in levels.values():
+            loaded |= level
+        if mask & ~loaded:
+            return mask & ~loaded
+        for count in sorted(levels):
+            if mask & levels[count]:
+                return mask & levels[count]
+        return mask
+
+    def shift_count(self, date, shift_type):
+        return self.slot_counts[(date, shift_type)]
+
+    def assign(self, date, shift_type, caregiver_id):
+        # Lowest slot number not already taken for this date and shift type
+        taken = self.taken_slots[(date, shift_type)]
+        slot = 0
+        while slot in taken:
+            slot += 1
+        taken.add(slot)
+        self._record(date, shift_type, caregiver_id)
+        self.pending.append((date, shift_type, caregiver_id, slot))
+
+    def flush(self):
+        """Insert all pending assignments in one round trip and commit"""
+        count = insert_shifts(self.pending)
+        self.pending = []
+        return count
+
+def get_daily_demand(date):
+    return [(shift_type, count) for shift_type, count in DAILY_DEMAND
+            if not (shift_type == 'B' and date.weekday() == 5)]
+
+class ScheduleProblem:
+    """Integer model of a generation window: days x shift types x caregivers.
+
+    Engines only see this object and a ShiftLedger, so they can be run and
+    benchmarked without a database.
+    """
+    def __init__(self, start_date, caregivers, num_weeks=1, time_off=None, constraints=None):
+        self.start_date = start_date
+        self.num_weeks = num_weeks
+        self.caregivers = caregivers
+        # An AvailabilityIndex, or {caregiver_id: set of dates}
+        if not isinstance(time_off, AvailabilityIndex):
+            time_off = AvailabilityIndex.from_dates(time_off or {})
+        self.time_off = time_off
+        self.constraints = constraints or ScheduleConstraints()
+
+    @classmethod
+    def from_db(cls, start_date, num_weeks=1, caregivers=None):
+        """Build a problem from the caregivers and approved time off in the window"""
+        if caregivers is None:
+            caregivers = Caregiver.query.all()
+        end_date = start_date + timedelta(weeks=num_weeks)
+        time_off = AvailabilityIndex.build(start_date, end_date - timedelta(days=1))
+        return cls(start_date, caregivers, num_weeks, time_off)
+
+    def week_days(self, week):
+        week_start = self.start_date + timedelta(weeks=week)
+        return [week_start + timedelta(days=i) for i in range(7)]
+
+    def is_off(self, caregiver_id, date):
+        return self.time_off.is_off(caregiver_id, date)
+
+class ScheduleEngine(ABC):
+    """Interface for schedule engines.
+
+    solve() fills the open slots of the problem by calling ledger.assign();
+    the caller owns flushing the ledger to the database. An engine that
+    does not implement solve() cannot be instantiated.
+    """
+    name = None
 
-    # Validate and fix any missing shifts
-    fix_missing_shifts(start_date)
-    print("Schedule generation completed. Validating schedule...")
-    validate_schedule(start_date)
+    @abstractmethod
+    def solve(self, problem, ledger):
+        """Fill the problem's open slots on ledger"""
 
-def fix_missing_shifts(start_date):
-    end_date = start_date + timedelta(days=7)
+class GreedyEngine(ScheduleEngine):
+    """Least-loaded-first day-by-day pass followed by fix_missing_shifts"""
+    name = 'greedy'
+
+    def solve(self, problem, ledger):
+        caregivers = problem.caregivers
+        rest_rules = problem.constraints.rest_rules
+        cap = problem.constraints.shifts_per_week
+        pool = ledger.register([cg.id for cg in caregivers])
+
+        for week in range(problem.num_weeks):
+            start_date = problem.start_date + timedelta(weeks=week)
+            current_date = start_date
+
+            for day in range(7):
+                available = pool & ~ledger.mask_of(problem.time_off.off_on(current_date))
+
+                def assign(shift_type):
+                    free = ledger.free_mask(current_date, shift_type, available, rest_rules, cap)
+                    caregiver_id = ledger.least_loaded(free, current_date)
+                    if caregiver_id is not None:
+                        ledger.assign(current_date, shift_type, caregiver_id)
+
+                # Assign A shift (1 caregiver)
+                assign('A')
+
+                # Assign G shifts (2 caregivers - G1 and G2)
+                assign('G1')
+                assign('G2')
+
+                # Assign B shift (2 caregivers, except Saturday)
+                if current_date.weekday() != 5:  # Not Saturday
+                    for _ in range(2):
+                        assign('B')
+
+                # Assign C shift (1 caregiver)
+                assign('C')
+
+                current_date += timedelta(days=1)
+
+            fix_missing_shifts(start_date, ledger=ledger, caregivers=caregivers, rest_rules=rest_rules,
+                               time_off=problem.time_off)
+
+class SolverEngine(ScheduleEngine):
+    """Branch-and-bound search minimising unfilled slots.
+
+    Every filled slot moves one caregiver towards their weekly target and
+    caps equal the target, so minimising unfilled slots also minimises the
+    total distance from the 40-hour target. Hard rules: one shift per
+    caregiver per day, no shifts on approved time off, weekly cap, rest
+    rules, no B on Saturday. Weeks are solved one after another on the same
+    ledger (a rolling horizon), each with its share of the time budget; the
+    best solution found so far is kept when the budget runs out, and any
+    slots still open after that are topped up by fix_missing_shifts.
+    """
+    name = 'solver'
+
+    def __init__(self, time_limit=0.5):
+        self.time_limit = time_limit
+
+    def solve(self, problem, ledger):
+        deadline = time.perf_counter() + self.time_limit
+        for week in range(problem.num_weeks):
+            weeks_left = problem.num_weeks - week
+            week_deadline = time.perf_counter() + (deadline - time.perf_counter()) / weeks_left
+            for date, shift_type, caregiver_id in self._solve_week(problem, ledger, week, week_deadline):
+                ledger.assign(date, shift_type, caregiver_id)
+            # Large weeks can run out of budget before the search reaches a leaf
+            fix_missing_shifts(problem.week_days(week)[0], ledger=ledger, caregivers=problem.caregivers,
+                               rest_rules=problem.constraints.rest_rules, time_off=problem.time_off)
+
+    def _solve_week(self, problem, ledger, week, deadline):
+        days = problem.week_days(week)
+        cap = problem.constraints.shifts_per_week
+        rest_rules = problem.constraints.rest_rules
+        ids = [cg.id for cg in problem.caregivers]
+        n = len(ids)
+
+        # Open slots per day, after anything already on the ledger
+        slots = []
+        for d, date in enumerate(days):
+            for shift_type, count in get_daily_demand(date):
+                for _ in range(count - ledger.shift_count(date, shift_type)):
+                    slots.append((d, shift_type))
+        if not slots:
+            return []
+
+        counts = [ledger.weekly_shifts(cid, days[0]) for cid in ids]
+        busy = [[cid in ledger.working_on(date) or problem.is_off(cid, date) for cid in ids]
+                for date in days]
+        # Shift type held on each day from the day before the week to the day
+        # after it: types[d + 1] belongs to days[d]
+        edges = [days[0] - timedelta(days=1)] + days + [days[-1] + timedelta(days=1)]
+        types = [dict(ledger.working_on(date)) for date in edges]
+        slots_left_on = [0] * len(days)
+        for d, _ in slots:
+            slots_left_on[d] += 1
+
+        best = {'unfilled': len(slots) + 1, 'assignment': None}
+        assignment = [None] * len(slots)
+
+        def free_days_from(c, d):
+            return sum(1 for day in range(d, len(days)) if not busy[day][c])
+
+        def lower_bound(i):
+            # Slots that cannot be covered by any free caregiver on their day,
+            # or by the total capacity left this week
+            d0 = slots[i][0]
+            per_day = 0
+            for d in range(d0, len(days)):
+                if slots_left_on[d]:
+                    free = sum(1 for c in range(n) if not busy[d][c] and counts[c] < cap)
+                    per_day += max(0, slots_left_on[d] - free)
+            capacity = sum(min(cap - counts[c], free_days_from(c, d0)) for c in range(n))
+            return max(per_day, len(slots) - i - capacity)
+
+        def rested(c, d, shift_type):
+            cid = ids[c]
+            return ((types[d].get(cid), shift_type) not in rest_rules and
+                    (shift_type, types[d + 2].get(cid)) not in rest_rules)
+
+        def search(i, unfilled):
+            if unfilled >= best['unfilled'] or time.perf_counter() > deadline:
+                return
+            if i == len(slots):
+                best['unfilled'] = unfilled
+                best['assignment'] = list(assignment)
+                return
+            if unfilled + lower_bound(i) >= best['unfilled']:
+                return
+
+            d, shift_type = slots[i]
+            candidates = [c for c in range(n)
+                          if not busy[d][c] and counts[c] < cap and rested(c, d, shift_type)]
+            # Most constrained first: least slack between free days and needed shifts
+            candidates.sort(key=lambda c: (free_days_from(c, d) - (cap - counts[c]), counts[c], c))
+
+            seen = set()
+            slots_left_on[d] -= 1
+            for c in candidates:
+                # Caregivers in identical states are interchangeable
+                signature = (counts[c],
+                             tuple(busy[day][c] for day in range(d, len(days))),
+                             tuple(types[t].get(ids[c]) for t in range(d, len(types))))
+                if signature in seen:
+                    continue
+                seen.add(signature)
+                counts[c] += 1
+                busy[d][c] = True
+                types[d + 1][ids[c]] = shift_type
+                assignment[i] = c
+                search(i + 1, unfilled)
+                counts[c] -= 1
+                busy[d][c] = False
+                del types[d + 1][ids[c]]
+                if best['unfilled'] == 0:
+                    break
+            if best['unfilled'] > 0:
+                assignment[i] = None
+                search(i + 1, unfilled + 1)
+            slots_left_on[d] += 1
+
+        search(0, 0)
+        if best['assignment'] is None:
+            return []
+        return [(days[d], shift_type, ids[c])
+                for (d, shift_type), c in zip(slots, best['assignment']) if c is not None]
+
+ENGINES = {
+    GreedyEngine.name: GreedyEngine,
+    SolverEngine.name: SolverEngine,
+}
+
+def get_engine(name, **kwargs):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown schedule engine: {name}")
+    return ENGINES[name](**kwargs)
+
+def count_violations(problem, ledger):
+    """Count rule violations and missed targets for the solved window"""
+    cap = problem.constraints.shifts_per_week
+    rest_rules = problem.constraints.rest_rules
+    violations = {'unfilled': 0, 'time_off': 0, 'over_cap': 0, 'off_target': 0, 'rest': 0,
+                  'double_booked': ledger.double_booked}
+    for week in range(problem.num_weeks):
+        days = problem.week_days(week)
+        for date in days:
+            for shift_type, count in get_daily_demand(date):
+                violations['unfilled'] += max(0, count - ledger.shift_count(date, shift_type))
+        for cg in problem.caregivers:
+            shifts = ledger.weekly_shifts(cg.id, days[0])
+            if shifts > cap:
+                violations['over_cap'] += 1
+            if shifts != cap:
+                violations['off_target'] += 1
+    for date, shifts in list(ledger.daily_shifts.items()):
+        violations['time_off'] += sum(1 for cid in shifts if problem.is_off(cid, date))
+        next_day = ledger.daily_shifts.get(date + timedelta(days=1), {})
+        violations['rest'] += sum(1 for cid, shift_type in shifts.items()
+                                  if (shift_type, next_day.get(cid)) in rest_rules)
+    return violations
+
+def generate_schedule(start_date, num_weeks=1, engine=None, time_limit=None):
+    """Generate num_weeks weeks from start_date, replacing only that window.
+
+    Weeks are filled in order on one ledger, so weekly load, total load and
+    rest rules carry over from one week to the next.
+    """
+    end_date = start_date + timedelta(weeks=num_weeks)
+    if engine is None:
+        engine = current_app.config.get('SCHEDULE_ENGINE', SolverEngine.name)
+    if time_limit is None:
+        time_limit = current_app.config.get('SOLVER_TIME_LIMIT', 0.5)
+    kwargs = {'time_limit': time_limit} if engine == SolverEngine.name else {}
+
+    try:
+        # Clear the target window; the delete and the new shifts commit together
+        delete_shifts(start_date, end_date - timedelta(days=1))
+        problem = ScheduleProblem.from_db(start_date, num_weeks)
+        ledger = ShiftLedger(start_date, num_weeks).load()
+        try:
+            get_engine(engine, **kwargs).solve(problem, ledger)
+        except Exception as e:
+            if engine == GreedyEngine.name:
+                raise
+            # Fall back to the fast greedy pass on a clean ledger
+            logger.error("Schedule engine '%s' failed, falling back to greedy: %s", engine, e)
+            ledger = ShiftLedger(start_date, num_weeks).load()
+            GreedyEngine().solve(problem, ledger)
+
+        # Write everything in one go
+        ledger.flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info("Generated %d week(s) from %s with the %s engine", num_weeks, start_date, engine)
+
+def fix_missing_shifts(start_date, ledger=None, caregivers=None, rest_rules=None, time_off=None):
+    """Fill any slot in the week from start_date still below its daily demand"""
     current_date = start_date
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = ShiftLedger(start_date).load()
+    if caregivers is None:
+        caregivers = Caregiver.query.all()
+    if rest_rules is None:
+        rest_rules = ScheduleConstraints().rest_rules
+    if time_off is None:
+        time_off = AvailabilityIndex.build(start_date, start_date + timedelta(days=6))
+    cap = ScheduleConstraints().shifts_per_week
+    pool = ledger.register([cg.id for cg in caregivers])
     
     for day in range(7):
-        # Check each shift type
-        for shift_type in ['A', 'G', 'B', 'C']:
-            if shift_type == 'B' and current_date.weekday() == 5:  # Skip B shift on Saturday
-                continue
-                
-            expected_count = 2 if shift_type in ['G', 'B'] else 1
-            actual_shifts = Shift.query.filter(
-                Shift.date == current_date,
-                Shift.shift_type == shift_type
-            ).count()
-            
-            if actual_shifts < expected_count:
-                # Find caregivers with less than 5 shifts who aren't working this day
-                used_today = set(s.caregiver_id for s in Shift.query.filter(Shift.date == current_date).all())
-                available = []
-                
-                for cg in Caregiver.query.all():
-                    if (cg.id not in used_today and 
-                        get_caregiver_weekly_shifts(cg, start_date, end_date) < 5):
-                        available.append(cg)
-                
-                # Assign missing shifts
-                for _ in range(expected_count - actual_shifts):
-                    if available:
-                        cg = min(available, key=lambda x: get_caregiver_weekly_shifts(x, start_date, end_date))
-                        available.remove(cg)
-                        shift = Shift(date=current_date, shift_type=shift_type, caregiver=cg)
-                        db.session.add(shift)
+        available = pool & ~ledger.mask_of(time_off.off_on(current_date))
+        for shift_type, expected_count in get_daily_demand(current_date):
+            for _ in range(expected_count - ledger.shift_count(current_date, shift_type)):
+                # Least loaded caregiver who is free, rested and under the weekly cap
+                free = ledger.free_mask(current_date, shift_type, available, rest_rules, cap)
+                caregiver_id = ledger.least_loaded(free, current_date)
+                if caregiver_id is None:
+                    break
+                ledger.assign(current_date, shift_type, caregiver_id)
                         
         current_date += timedelta(days=1)
-    db.session.commit()
+    if own_ledger:
+        ledger.flush()
 
-def validate_schedule(start_date):
+def validate_schedule(start_date, num_weeks=1):
+    """Print weekly loads and the shift distribution; a report for running this module by hand"""
     caregivers = Caregiver.query.all()
-    end_date = start_date + timedelta(days=7)
+    end_date = start_date + timedelta(weeks=num_weeks)
+    shifts = Shift.query.filter(
+        Shift.date >= start_date,
+        Shift.date < end_date
+    ).all()
+    weekly_counts = defaultdict(int)
+    for shift in shifts:
+        weekly_counts[(shift.caregiver_id, (shift.date - start_date).days // 7)] += 1
 
     print("\nSchedule Validation Report:")
     print("-" * 50)
     
-    for caregiver in caregivers:
-        weekly_shifts = get_caregiver_weekly_shifts(caregiver, start_date, end_date)
-        weekly_hours = weekly_shifts * 8
-        
-        print(f"\n{caregiver.name}:")
-        print(f"Weekly Shifts: {weekly_shifts}/5")
-        print(f"Weekly Hours: {weekly_hours}/40")
-        
-        if weekly_hours != 40:
-            print(f"WARNING: {caregiver.name} has {weekly_hours} hours instead of 40")
-        if weekly_shifts > 5:
-            print(f"WARNING: {caregiver.name} has {weekly_shifts} shifts (more than 5 days/week)")
+    for week in range(num_weeks):
+        if num_weeks > 1:
+            print(f"\nWeek of {start_date + timedelta(weeks=week)}:")
+        for caregiver in caregivers:
+            weekly_shifts = weekly_counts[(caregiver.id, week)]
+            weekly_hours = weekly_shifts * 8
+            
+            print(f"\n{caregiver.name}:")
+            print(f"Weekly Shifts: {weekly_shifts}/5")
+            print(f"Weekly Hours: {weekly_hours}/40")
+            
+            if weekly_hours != 40:
+                print(f"WARNING: {caregiver.name} has {weekly_hours} hours instead of 40")
+            if weekly_shifts > 5:
+                print(f"WARNING: {caregiver.name} has {weekly_shifts} shifts (more than 5 days/week)")
 
     # Print shift distribution
+    names = {c.id: c.name for c in caregivers}
+    by_slot = defaultdict(list)
+    for shift in shifts:
+        by_slot[(shift.date, shift.shift_type)].append(names.get(shift.caregiver_id, '?'))
     print("\nShift Distribution:")
     print("-" * 50)
     current = start_date
-    for day in range(7):
-        print(f"\n{current.strftime('%A')}:")
-        for shift_type in ['A', 'G', 'B', 'C']:
-            shifts = Shift.query.filter(
-                Shift.date == current,
-                Shift.shift_type == shift_type
-            ).all()
-            print(f"{shift_type} Shift: {', '.join(s.caregiver.name for s in shifts)}")
+    while current < end_date:
+        print(f"\n{current.strftime('%A')}{' ' + str(current) if num_weeks > 1 else ''}:")
+        for shift_type in ['A', 'G1', 'G2', 'B', 'C']:
+            print(f"{shift_type} Shift: {', '.join(by_slot[(current, shift_type)])}")
         current += timedelta(days=1)
 
 if __name__ == '__main__':
@@ -167,4 +619,5 @@ if __name__ == '__main__':
     with app.app_context():
         start_date = datetime.now().date()
         start_date = start_date - timedelta(days=start_date.weekday())  # Start from Monday
-        generate_schedule(start_date) 
\ No newline at end of file
+        generate_schedule(start_date)
+        validate_schedule(start_date)
\ No newline at end of file
@@ -0,0 +1,131 @@
+from datetime import timedelta
+from .availability import AvailabilityIndex
+from .models import db, Caregiver, Shift
+from .cache import bump_schedule_version
+from .schedule_generator import ScheduleConstraints, ShiftLedger
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _week_start(date):
+    return date - timedelta(days=date.weekday())
+
+class ScheduleRepair:
+    """Minimal-change reassignment of the shifts hit by a time-off change.
+
+    Only the calendar weeks around the changed range are loaded. Each
+    affected shift is handed to a free caregiver under the weekly cap if
+    possible; otherwise one of that caregiver's other shifts in the week is
+    passed on to a third caregiver to make room (two rows changed). Shifts
+    that cannot be covered are left as they are, so they keep showing as
+    time off that needs a replacement.
+    """
+    def __init__(self, caregiver_id, start_date, end_date, constraints=None):
+        self.caregiver_id = caregiver_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.constraints = constraints or ScheduleConstraints()
+        self.changes = []
+        self.unfilled = []
+
+    def _load(self):
+        window_start = _week_start(self.start_date)
+        num_weeks = (self.end_date - window_start).days // 7 + 1
+        self.ledger = ShiftLedger(window_start, num_weeks)
+
+        # One day either side of the window so rest rules see the neighbours
+        self.shifts = Shift.query.filter(
+            Shift.date >= window_start - timedelta(days=1),
+            Shift.date <= self.ledger.end_date
+        ).all()
+        self.ledger.load([(s.date, s.shift_type, s.caregiver_id, s.slot) for s in self.shifts])
+
+        self.time_off = AvailabilityIndex.build(window_start, self.ledger.end_date - timedelta(days=1))
+
+        self.caregivers = {c.id: c.name for c in Caregiver.query.all()}
+
+    def _is_off(self, caregiver_id, date):
+        return self.time_off.is_off(caregiver_id, date)
+
+    def _can_work(self, caregiver_id, date, shift_type, ignore_cap=False):
+        ledger = self.ledger
+        return (caregiver_id not in ledger.working_on(date) and
+                not self._is_off(caregiver_id, date) and
+                (ignore_cap or ledger.weekly_shifts(caregiver_id, date) < self.constraints.shifts_per_week) and
+                caregiver_id not in ledger.rest_blocked(date, shift_type, self.constraints.rest_rules))
+
+    def _least_loaded(self, caregiver_ids):
+        ledger = self.ledger
+        return sorted(caregiver_ids, key=lambda cid: (ledger.total_shifts(cid), cid))
+
+    def _reassign(self, shift, new_id):
+        self.changes.append({
+            'shift_id': shift.id,
+            'date': shift.date.isoformat(),
+            'shift_type': shift.shift_type,
+            'from_caregiver_id': shift.caregiver_id,
+            'from_caregiver': self.caregivers.get(shift.caregiver_id),
+            'to_caregiver_id': new_id,
+            'to_caregiver': self.caregivers.get(new_id),
+        })
+        self.ledger.move(shift.date, shift.shift_type, shift.caregiver_id, new_id)
+        shift.caregiver_id = new_id
+
+    def _direct(self, shift):
+        candidates = [cid for cid in self.caregivers
+                      if self._can_work(cid, shift.date, shift.shift_type)]
+        if candidates:
+            self._reassign(shift, self._least_loaded(candidates)[0])
+            return True
+        return False
+
+    def _swap(self, shift):
+        # A caregiver who is free that day but already at the weekly cap takes
+        # the shift and hands one of their other shifts this week to someone else
+        week = self.ledger.week_of(shift.date)
+        for helper_id in self._least_loaded(self.caregivers):
+            if not self._can_work(helper_id, shift.date, shift.shift_type, ignore_cap=True):
+                continue
+            for other in self.shifts:
+                if (other.caregiver_id != helper_id or other.date == shift.date or
+                        self.ledger.week_of(other.date) != week):
+                    continue
+                takers = [cid for cid in self.caregivers if cid != helper_id and
+                          self._can_work(cid, other.date, other.shift_type)]
+                if takers:
+                    self._reassign(other, self._least_loaded(takers)[0])
+                    self._reassign(shift, helper_id)
+                    return True
+        return False
+
+    def run(self, commit=True):
+        self._load()
+        affected = sorted(
+            (s for s in self.shifts
+             if s.caregiver_id == self.caregiver_id and self.start_date <= s.date <= self.end_date),
+            key=lambda s: s.date
+        )
+        for shift in affected:
+            if not (self._direct(shift) or self._swap(shift)):
+                self.unfilled.append({
+                    'shift_id': shift.id,
+                    'date': shift.date.isoformat(),
+                    'shift_type': shift.shift_type,
+                    'caregiver_id': shift.caregiver_id,
+                })
+        if self.changes:
+            bump_schedule_version()
+        if commit:
+            db.session.commit()
+        logger.info("Repaired schedule for caregiver %s: %d shifts changed, %d left uncovered",
+                    self.caregiver_id, len(self.changes), len(self.unfilled))
+        return {'changed': self.changes, 'unfilled': self.unfilled}
+
+def repair_schedule(caregiver_id, start_date, end_date, commit=True):
+    """Reassign caregiver_id's shifts between start_date and end_date.
+
+    Returns a diff: 'changed' lists every rewritten shift row with its old
+    and new caregiver, 'unfilled' the affected shifts nobody could cover.
+    With commit=False the changes are left in the caller's transaction.
+    """
+    return ScheduleRepair(caregiver_id, start_date, end_date).run(commit=commit)
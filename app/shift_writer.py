@@ -0,0 +1,65 @@
+"""Bulk writes of generated shifts.
+
+Generators hand over plain (date, shift_type, caregiver_id[, slot]) tuples
+instead of building Shift objects one by one; the writer clears the date
+range and inserts everything with a single executemany in one transaction.
+"""
+from .models import db, Shift
+from .cache import bump_schedule_version
+from collections import defaultdict
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _mappings(rows):
+    """Tuples to insert mappings, numbering slots where a row has none"""
+    next_slot = defaultdict(int)
+    mappings = []
+    for row in rows:
+        date, shift_type, caregiver_id = row[:3]
+        if len(row) > 3:
+            slot = row[3]
+            next_slot[(date, shift_type)] = max(next_slot[(date, shift_type)], slot + 1)
+        else:
+            slot = next_slot[(date, shift_type)]
+            next_slot[(date, shift_type)] += 1
+        mappings.append({'date': date, 'shift_type': shift_type, 'slot': slot, 'caregiver_id': caregiver_id})
+    return mappings
+
+def delete_shifts(start_date, end_date):
+    """Delete the shifts from start_date to end_date inclusive; does not commit"""
+    return Shift.query.filter(
+        Shift.date >= start_date,
+        Shift.date <= end_date
+    ).delete(synchronize_session=False)
+
+def insert_shifts(rows, commit=True):
+    """Insert (date, shift_type, caregiver_id[, slot]) rows with one executemany.
+
+    On Postgres, psycopg2 folds the executemany into multi-row INSERTs, so a
+    quarter of shifts is a single round trip. Returns the number inserted.
+    """
+    mappings = _mappings(rows)
+    if mappings:
+        db.session.execute(Shift.__table__.insert(), mappings)
+    bump_schedule_version()
+    if commit:
+        db.session.commit()
+    return len(mappings)
+
+def replace_shifts(start_date, end_date, rows, commit=True):
+    """Replace every shift from start_date to end_date inclusive with rows.
+
+    The delete and the insert run in one transaction; on error it is rolled
+    back and the exception re-raised. Returns {'deleted': n, 'inserted': n}.
+    """
+    try:
+        deleted = delete_shifts(start_date, end_date)
+        inserted = insert_shifts(rows, commit=False)
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info("Replaced %s shifts with %s from %s to %s", deleted, inserted, start_date, end_date)
+    return {'deleted': deleted, 'inserted': inserted}
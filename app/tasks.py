@@ -0,0 +1,69 @@
+"""Job handlers run by the worker (see jobs.py).
+
+Each handler takes a JobContext and returns a JSON-serialisable result.
+Raising marks the attempt as failed and lets the queue retry it.
+"""
+from .models import Shift
+from .projection import default_window, materialize
+from .utils import ensure_sync
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+def job_window(ctx):
+    """Inclusive (start, end) dates from the job params, else the default window"""
+    start_date, end_date = default_window()
+    if ctx.params.get('start'):
+        start_date = datetime.strptime(ctx.params['start'], '%Y-%m-%d').date()
+    if ctx.params.get('end'):
+        end_date = datetime.strptime(ctx.params['end'], '%Y-%m-%d').date()
+    if end_date < start_date:
+        raise ValueError('end must not be before start')
+    return start_date, end_date
+
+def fill_schedule(ctx):
+    """Project the weekly template over the window, skipping approved time off"""
+    start_date, end_date = job_window(ctx)
+    ctx.progress(5, f'Projecting the weekly template from {start_date} to {end_date}')
+
+    counts = materialize(start_date, end_date, extend=bool(ctx.params.get('extend')))
+    shifts_created = counts['inserted']
+    logger.info("Filled schedule with %s shifts", shifts_created)
+    return {
+        'shifts_created': shifts_created,
+        'shifts_deleted': counts['deleted'],
+        'start': counts['start'],
+        'end': counts['end'],
+        'message': f'Schedule filled successfully with {shifts_created} shifts'
+    }
+
+def sync_calendar(ctx):
+    """Push the shifts in the window to Google Calendar"""
+    from .google_calendar import sync_shifts_to_calendar
+
+    start_date, end_date = job_window(ctx)
+    shifts = Shift.query.filter(
+        Shift.date >= start_date,
+        Shift.date <= end_date
+    ).order_by(Shift.date).all()
+
+    # An empty window still syncs: its events are removed from the calendar
+    ctx.progress(10, f'Syncing {len(shifts)} shifts')
+    result = sync_shifts_to_calendar(shifts, start_date=start_date, end_date=end_date)
+    result['message'] = (f"Successfully synced {len(shifts)} shifts to Google Calendar "
+                         f"({result['inserted']} added, {result['updated']} updated, "
+                         f"{result['deleted']} removed)")
+    return result
+
+def sync_config(ctx):
+    """Rebuild the current week from the stored weekly template"""
+    if not ensure_sync():
+        raise RuntimeError('Failed to sync weekly template to schedule')
+    return {'message': 'Successfully synced weekly template to schedule'}
+
+HANDLERS = {
+    'fill_schedule': fill_schedule,
+    'sync_calendar': sync_calendar,
+    'sync_config': sync_config,
+}
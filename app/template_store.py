@@ -0,0 +1,146 @@
+from .config import ShiftConfig, TimeOffConfig
+from .models import db, Caregiver, TimeOff, WeeklyTemplate, TemplateSlot
+from .cache import bump_schedule_version
+from datetime import datetime
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE = 'default'
+
+# Pattern cached per process; reloaded only when the template version moves
+_cache = {'key': None, 'pattern': None}
+_cache_lock = threading.Lock()
+
+def _template_row():
+    return db.session.query(WeeklyTemplate.id, WeeklyTemplate.version).filter(
+        WeeklyTemplate.name == DEFAULT_TEMPLATE
+    ).first()
+
+def _copy(pattern):
+    return {day: dict(shifts) for day, shifts in pattern.items()}
+
+def get_weekly_pattern():
+    """Weekly pattern as {weekday: {shift_type: caregiver name}}.
+
+    Costs one indexed version lookup per call; the slots are only reloaded
+    after an edit in any worker has bumped the version. Falls back to
+    ShiftConfig.WEEKLY_PATTERN until the template has been imported.
+    """
+    row = _template_row()
+    if row is None:
+        return _copy(ShiftConfig.WEEKLY_PATTERN)
+
+    key = (row.id, row.version)
+    with _cache_lock:
+        if _cache['key'] == key:
+            return _copy(_cache['pattern'])
+
+    pattern = {day: {} for day in range(7)}
+    slots = db.session.query(TemplateSlot.weekday, TemplateSlot.shift_type, Caregiver.name).join(
+        Caregiver, TemplateSlot.caregiver_id == Caregiver.id
+    ).filter(
+        TemplateSlot.template_id == row.id
+    ).order_by(TemplateSlot.weekday, TemplateSlot.id).all()
+    for weekday, shift_type, name in slots:
+        pattern[weekday][shift_type] = name
+
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['pattern'] = pattern
+    return _copy(pattern)
+
+def _bump_version(template_id):
+    WeeklyTemplate.query.filter(WeeklyTemplate.id == template_id).update({
+        'version': WeeklyTemplate.version + 1,
+        'updated_at': datetime.utcnow()
+    }, synchronize_session=False)
+    # The calendar view fills days from the template
+    bump_schedule_version()
+
+def _require_template_id():
+    row = _template_row()
+    if row is None:
+        import_config_template()
+        row = _template_row()
+    return row.id
+
+def set_slot(weekday, shift_type, caregiver_id):
+    """Assign a template slot; the caller commits"""
+    template_id = _require_template_id()
+    updated = TemplateSlot.query.filter(
+        TemplateSlot.template_id == template_id,
+        TemplateSlot.weekday == weekday,
+        TemplateSlot.shift_type == shift_type
+    ).update({'caregiver_id': caregiver_id}, synchronize_session=False)
+    if not updated:
+        db.session.add(TemplateSlot(template_id=template_id, weekday=weekday,
+                                    shift_type=shift_type, caregiver_id=caregiver_id))
+    _bump_version(template_id)
+
+def clear_slot(weekday, shift_type):
+    """Remove a template slot; the caller commits"""
+    template_id = _require_template_id()
+    TemplateSlot.query.filter(
+        TemplateSlot.template_id == template_id,
+        TemplateSlot.weekday == weekday,
+        TemplateSlot.shift_type == shift_type
+    ).delete(synchronize_session=False)
+    _bump_version(template_id)
+
+def _group_dates(dates):
+    """Collapse a list of dates into (start, end) ranges of consecutive days"""
+    dates = sorted(dates)
+    ranges = []
+    range_start = prev_date = dates[0]
+    for date in dates[1:]:
+        if (date - prev_date).days > 1:
+            ranges.append((range_start, prev_date))
+            range_start = date
+        prev_date = date
+    ranges.append((range_start, prev_date))
+    return ranges
+
+def import_config_template():
+    """One-time import of ShiftConfig.WEEKLY_PATTERN and TimeOffConfig.SCHEDULE.
+
+    Does nothing once the template exists. Caregivers named in the config
+    are created if missing; config time off is imported as approved.
+    """
+    if _template_row() is not None:
+        return False
+
+    names = {name for shifts in ShiftConfig.WEEKLY_PATTERN.values() for name in shifts.values() if name}
+    names |= set(TimeOffConfig.SCHEDULE)
+    caregiver_ids = {c.name: c.id for c in Caregiver.query.filter(Caregiver.name.in_(names)).all()}
+    missing = [Caregiver(name=name) for name in sorted(names - set(caregiver_ids))]
+    if missing:
+        db.session.add_all(missing)
+        db.session.flush()
+        caregiver_ids.update({c.name: c.id for c in missing})
+
+    template = WeeklyTemplate(name=DEFAULT_TEMPLATE, version=1)
+    db.session.add(template)
+    db.session.flush()
+    db.session.bulk_insert_mappings(TemplateSlot, [
+        {'template_id': template.id, 'weekday': int(day), 'shift_type': shift_type,
+         'caregiver_id': caregiver_ids[name]}
+        for day, shifts in ShiftConfig.WEEKLY_PATTERN.items()
+        for shift_type, name in shifts.items() if name
+    ])
+
+    existing = {(t.caregiver_id, t.start_date, t.end_date) for t in TimeOff.query.filter(
+        TimeOff.caregiver_id.in_([caregiver_ids[name] for name in TimeOffConfig.SCHEDULE])
+    ).all()}
+    for name, dates in TimeOffConfig.SCHEDULE.items():
+        if not dates:
+            continue
+        for start_date, end_date in _group_dates(dates):
+            if (caregiver_ids[name], start_date, end_date) not in existing:
+                db.session.add(TimeOff(caregiver_id=caregiver_ids[name], start_date=start_date,
+                                       end_date=end_date, status='approved'))
+
+    db.session.commit()
+    logger.info("Imported weekly template and time off from config")
+    return True
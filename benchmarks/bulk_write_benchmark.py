@@ -0,0 +1,63 @@
+"""Writing a quarter of shifts: one Shift object at a time vs the bulk writer.
+
+    python -m benchmarks.bulk_write_benchmark
+"""
+import time
+from datetime import date, timedelta
+
+from benchmarks.support import app, count_queries, reset_database
+from app.models import db, Caregiver, Shift
+from app.schedule_generator import get_daily_demand
+from app.shift_writer import replace_shifts
+
+START = date(2025, 1, 6)
+NUM_DAYS = 13 * 7
+NUM_CAREGIVERS = 20
+
+
+def build_rows(ids):
+    rows = []
+    for offset in range(NUM_DAYS):
+        day = START + timedelta(days=offset)
+        for shift_type, count in get_daily_demand(day):
+            for slot in range(count):
+                rows.append((day, shift_type, ids[(offset + len(rows)) % len(ids)], slot))
+    return rows
+
+
+def orm_write(rows):
+    """The old path: range delete, then db.session.add per shift and a commit per day"""
+    Shift.query.filter(Shift.date >= START, Shift.date < START + timedelta(days=NUM_DAYS)).delete()
+    current = None
+    for day, shift_type, caregiver_id, slot in rows:
+        if current is not None and day != current:
+            db.session.commit()
+        current = day
+        db.session.add(Shift(date=day, shift_type=shift_type, slot=slot, caregiver_id=caregiver_id))
+    db.session.commit()
+
+
+def bulk_write(rows):
+    replace_shifts(START, START + timedelta(days=NUM_DAYS - 1), rows)
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        db.session.bulk_insert_mappings(Caregiver, [{'name': f'CG{i}'} for i in range(NUM_CAREGIVERS)])
+        db.session.commit()
+        rows = build_rows([c.id for c in Caregiver.query.all()])
+        print(f'{len(rows)} shifts over {NUM_DAYS} days')
+
+        for label, write in (('ORM objects', orm_write), ('bulk writer', bulk_write)):
+            # Run twice so the second run also replaces existing rows
+            write(rows)
+            with count_queries() as counter:
+                started = time.perf_counter()
+                write(rows)
+                elapsed = time.perf_counter() - started
+            print(f'  {label:<12} {elapsed * 1000:7.1f} ms  {counter["queries"]:4d} statements')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Time /calendar over a 90-day window with 50 caregivers.
+
+Fails if the number of queries depends on the window length.
+
+    python -m benchmarks.calendar_benchmark
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.support import add_time_off, app, count_queries, reset_database, seed_pattern
+from app.utils import CAREGIVER_ORDER
+
+START = date(2025, 4, 7)
+NUM_CAREGIVERS = 50
+
+
+def render(client, days):
+    end = START + timedelta(days=days - 1)
+    with count_queries() as counter:
+        started = time.perf_counter()
+        response = client.get(f'/calendar?start={START}&end={end}')
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.status_code
+    return counter['queries'], elapsed
+
+
+def main():
+    rng = random.Random(0)
+    reset_database()
+    with app.app_context():
+        names = CAREGIVER_ORDER + [f'Extra{i}' for i in range(NUM_CAREGIVERS - len(CAREGIVER_ORDER))]
+        ids = seed_pattern(names, START, 90)
+        for name in names:
+            for _ in range(3):
+                first = START + timedelta(days=rng.randrange(90))
+                add_time_off(ids[name], first, first + timedelta(days=rng.randrange(5)))
+
+        client = app.test_client()
+        results = {days: render(client, days) for days in (14, 90)}
+    for days, (queries, elapsed) in results.items():
+        print(f'{days:>3}-day window, {NUM_CAREGIVERS} caregivers: {queries} queries, {elapsed * 1000:.1f} ms')
+    if results[14][0] != results[90][0]:
+        print('FAIL: query count grows with the window')
+        sys.exit(1)
+    print('OK: bounded query count')
+
+
+if __name__ == '__main__':
+    main()
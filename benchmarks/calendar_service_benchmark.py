@@ -0,0 +1,75 @@
+"""Cost of getting a Calendar service per sync: old per-call setup vs the cached one.
+
+Uses throwaway credentials with an hour left on the access token, so no
+network call is made. The old path unpickles token.pickle and calls
+build('calendar', 'v3') every time; the new one migrates the pickle to
+token.json once and then reuses the thread's service.
+
+    python -m benchmarks.calendar_service_benchmark
+"""
+import os
+import pickle
+import stat
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+TOKEN_DIR = tempfile.mkdtemp(prefix='ghs-token-')
+os.environ['GOOGLE_TOKEN_FILE'] = os.path.join(TOKEN_DIR, 'token.json')
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from app import google_calendar
+
+CALLS = 20
+
+
+def fake_credentials():
+    return Credentials(token='access-token', refresh_token='refresh-token',
+                       token_uri='https://oauth2.googleapis.com/token',
+                       client_id='client-id', client_secret='client-secret',
+                       scopes=google_calendar.SCOPES,
+                       expiry=datetime.utcnow() + timedelta(hours=1))
+
+
+def old_service(path):
+    with open(path, 'rb') as token:
+        creds = pickle.load(token)
+    return build('calendar', 'v3', credentials=creds)
+
+
+def timed(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def main():
+    legacy_path = google_calendar.LEGACY_TOKEN_PATH
+    with open(legacy_path, 'wb') as token:
+        pickle.dump(fake_credentials(), token)
+
+    # Warm the imports for both paths so only per-call work is measured
+    old_service(legacy_path)
+    google_calendar.discovery_document()
+
+    old_ms = timed(lambda: old_service(legacy_path), CALLS)
+    first_ms = timed(google_calendar.get_calendar_service, 1)
+    cached_ms = timed(google_calendar.get_calendar_service, CALLS)
+
+    print(f'  old: unpickle + build per call  {old_ms:7.2f} ms')
+    print(f'  first call (migrate + build)    {first_ms:7.2f} ms')
+    print(f'  cached service per call         {cached_ms:7.3f} ms')
+
+    mode = stat.S_IMODE(os.stat(google_calendar.TOKEN_PATH).st_mode)
+    migrated = os.path.exists(google_calendar.TOKEN_PATH) and not os.path.exists(legacy_path)
+    print(f'  token.pickle migrated to token.json: {migrated} (mode {mode:o})')
+    if not migrated or cached_ms >= old_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Sync eight weeks of shifts to a fake Calendar service and count round trips.
+
+The old sync deleted and re-inserted every event one HTTP call at a time.
+Fails if re-syncing an unchanged schedule makes any write calls, including
+after the same shifts are rewritten with new ids, or if a schedule from
+generate_schedule does not sync in full.
+
+    python -m benchmarks.calendar_sync_benchmark
+"""
+import sys
+from datetime import date, timedelta
+
+from benchmarks.fake_calendar import FakeCalendarService
+from benchmarks.support import app, reset_database, seed_pattern
+from app.google_calendar import sync_shifts_to_calendar
+from app.models import db, Shift
+from app.schedule_generator import generate_schedule
+from app.shift_writer import replace_shifts
+from app.utils import CAREGIVER_ORDER
+
+START = date(2025, 4, 7)
+END = START + timedelta(days=55)
+
+
+def sync(service):
+    service.round_trips = service.writes = 0
+    shifts = Shift.query.order_by(Shift.date).all()
+    result = sync_shifts_to_calendar(shifts, service=service, start_date=START, end_date=END)
+    return result, service.round_trips, service.writes
+
+
+def main():
+    reset_database()
+    failed = False
+    with app.app_context():
+        seed_pattern(CAREGIVER_ORDER, START, (END - START).days + 1)
+        num_shifts = Shift.query.count()
+        service = FakeCalendarService()
+        print(f'{num_shifts} shifts; old re-sync: {2 * num_shifts + 1} round trips')
+
+        labels = ('first sync', 'unchanged', 'regenerated', 'one reassigned, one removed',
+                  'last day removed', 'generated', 'all removed')
+        for label in labels:
+            if label == 'regenerated':
+                # Same schedule written again: every shift gets a new id
+                rows = [(s.date, s.shift_type, s.caregiver_id, s.slot) for s in Shift.query.all()]
+                replace_shifts(START, END, rows)
+            elif label.startswith('one'):
+                shifts = Shift.query.order_by(Shift.id).limit(2).all()
+                shifts[0].caregiver_id = shifts[1].caregiver_id
+                db.session.delete(shifts[1])
+                db.session.commit()
+            elif label == 'last day removed':
+                # Shifts at the edge of the window: their events must still be found and deleted
+                Shift.query.filter(Shift.date == END).delete()
+                db.session.commit()
+            elif label == 'generated':
+                # Two weeks from the generator, with both G shifts of each day
+                generate_schedule(START, 2)
+            elif label == 'all removed':
+                Shift.query.delete()
+                db.session.commit()
+            result, round_trips, writes = sync(service)
+            print(f'{label:>28}: {round_trips:>3} round trips, {writes:>3} writes {result}')
+            if label in ('unchanged', 'regenerated') and writes:
+                failed = True
+            if label == 'generated' and (result['errors'] or len(service.calendar) != Shift.query.count()):
+                print('FAIL: the generated schedule did not sync')
+                sys.exit(1)
+        if len(service.calendar) != Shift.query.count():
+            print('FAIL: calendar does not match the schedule')
+            sys.exit(1)
+    if failed:
+        print('FAIL: unchanged schedule caused writes')
+        sys.exit(1)
+    print('OK: only changed events are written')
+
+
+if __name__ == '__main__':
+    main()
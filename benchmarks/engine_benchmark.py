@@ -0,0 +1,71 @@
+"""Compare schedule engines on synthetic problems.
+
+Runs every engine on the same in-memory problems (no database writes) and
+reports wall/CPU solve time and constraint violations. Use --weeks to
+check rolling-horizon generation, e.g. a half year:
+
+    python -m benchmarks.engine_benchmark --caregivers 8 --weeks 26 --time-off 0.1
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Importing the app package builds an app; keep it off the real database
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'ghs_benchmark.db')
+
+from app.schedule_generator import ENGINES, ScheduleProblem, ShiftLedger, count_violations, get_engine
+
+BenchCaregiver = namedtuple('BenchCaregiver', ['id', 'name'])
+
+
+def make_problem(num_caregivers, num_weeks, time_off_density, seed, start_date=date(2025, 4, 7)):
+    rng = random.Random(seed)
+    caregivers = [BenchCaregiver(i + 1, f'CG{i + 1}') for i in range(num_caregivers)]
+    time_off = {}
+    for cg in caregivers:
+        days = {start_date + timedelta(days=d) for d in range(num_weeks * 7)
+                if rng.random() < time_off_density}
+        if days:
+            time_off[cg.id] = days
+    return ScheduleProblem(start_date, caregivers, num_weeks, time_off)
+
+
+def run(engine_name, problem, time_limit):
+    kwargs = {'time_limit': time_limit} if engine_name == 'solver' else {}
+    engine = get_engine(engine_name, **kwargs)
+    ledger = ShiftLedger(problem.start_date, problem.num_weeks)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    engine.solve(problem, ledger)
+    cpu = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+    return elapsed, cpu, count_violations(problem, ledger)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--caregivers', type=int, nargs='+', default=[7, 8, 10])
+    parser.add_argument('--weeks', type=int, default=1)
+    parser.add_argument('--time-off', type=float, nargs='+', default=[0.0, 0.1, 0.2])
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--time-limit', type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'engine':<8} {'cgs':>4} {'off':>5} {'seed':>4} {'time(ms)':>9} {'cpu(ms)':>8}  violations")
+    for num_caregivers in args.caregivers:
+        for density in args.time_off:
+            for seed in range(args.seeds):
+                problem = make_problem(num_caregivers, args.weeks, density, seed)
+                for engine_name in ENGINES:
+                    elapsed, cpu, violations = run(engine_name, problem, args.time_limit)
+                    summary = ' '.join(f'{k}={v}' for k, v in violations.items())
+                    print(f'{engine_name:<8} {num_caregivers:>4} {density:>5.2f} {seed:>4} '
+                          f'{elapsed * 1000:>9.1f} {cpu * 1000:>8.1f}  {summary}')
+
+
+if __name__ == '__main__':
+    main()
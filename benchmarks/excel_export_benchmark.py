@@ -0,0 +1,57 @@
+"""Excel export: time, file size and peak Python memory for growing ranges.
+
+With constant_memory and one week in memory at a time, the peak should
+stay roughly flat from a month to a year.
+
+    python -m benchmarks.excel_export_benchmark
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.support import app, reset_database
+from app.cli import init_database
+from app.excel_export import write_schedule_workbook
+from app.projection import materialize
+
+START = date(2025, 1, 6)
+
+
+def measure(weeks):
+    end = START + timedelta(weeks=weeks, days=-1)
+    path = os.path.join(tempfile.gettempdir(), f'ghs-export-{weeks}.xlsx')
+    tracemalloc.start()
+    started = time.perf_counter()
+    sheets = write_schedule_workbook(START, end, path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(path)
+    os.remove(path)
+    return sheets, elapsed, peak, size
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        init_database()
+        materialize(START, START + timedelta(weeks=52, days=-1))
+
+        peaks = {}
+        for weeks in (4, 13, 52):
+            sheets, elapsed, peak, size = measure(weeks)
+            peaks[weeks] = peak
+            print(f'  {weeks:>2} weeks: {sheets:>2} sheets  {elapsed * 1000:7.1f} ms  '
+                  f'peak {peak / 1024:7.0f} KB  file {size / 1024:6.0f} KB')
+
+    if peaks[52] > 2 * peaks[4]:
+        print('FAIL: peak memory grows with the range')
+        sys.exit(1)
+    print('OK: bounded peak memory')
+
+
+if __name__ == '__main__':
+    main()
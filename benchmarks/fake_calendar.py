@@ -0,0 +1,104 @@
+"""In-memory stand-in for the Google Calendar v3 service.
+
+Implements the calls google_calendar.sync_shifts_to_calendar makes
+(events().list/insert/update/delete and new_batch_http_request) and counts
+HTTP round trips and write calls.
+"""
+import itertools
+from datetime import datetime
+
+
+def _instant(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class _Request:
+    def __init__(self, service, method, kwargs):
+        self.service = service
+        self.method = method
+        self.kwargs = kwargs
+
+    def execute(self):
+        self.service.round_trips += 1
+        return self.run()
+
+    def run(self):
+        return getattr(self.service, '_' + self.method)(**self.kwargs)
+
+
+class _Events:
+    def __init__(self, service):
+        self.service = service
+
+    def __getattr__(self, method):
+        if method not in ('list', 'insert', 'update', 'delete'):
+            raise AttributeError(method)
+        return lambda **kwargs: _Request(self.service, method, kwargs)
+
+
+class _Batch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        if len(self.requests) >= 50:
+            raise ValueError('a batch holds at most 50 calls')
+        self.requests.append((request_id or str(len(self.requests) + 1), request))
+
+    def execute(self):
+        self.service.round_trips += 1
+        for request_id, request in self.requests:
+            try:
+                response, exception = request.run(), None
+            except KeyError as e:
+                response, exception = None, e
+            if self.callback:
+                self.callback(request_id, response, exception)
+
+
+class FakeCalendarService:
+    PAGE_SIZE = 250
+
+    def __init__(self):
+        self.calendar = {}
+        self.round_trips = 0
+        self.writes = 0
+        self._ids = itertools.count(1)
+
+    def events(self):
+        return _Events(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self, callback)
+
+    def _list(self, calendarId, timeMin, timeMax, pageToken=None, maxResults=None, **kwargs):
+        # Like the API: events overlapping [timeMin, timeMax)
+        time_min, time_max = _instant(timeMin), _instant(timeMax)
+        items = sorted((e for e in self.calendar.values()
+                        if _instant(e['end']['dateTime']) > time_min and _instant(e['start']['dateTime']) < time_max),
+                       key=lambda e: _instant(e['start']['dateTime']))
+        offset = int(pageToken or 0)
+        page = items[offset:offset + self.PAGE_SIZE]
+        result = {'items': [dict(e) for e in page]}
+        if offset + self.PAGE_SIZE < len(items):
+            result['nextPageToken'] = str(offset + self.PAGE_SIZE)
+        return result
+
+    def _insert(self, calendarId, body):
+        self.writes += 1
+        event = dict(body, id=f'evt{next(self._ids)}')
+        self.calendar[event['id']] = event
+        return event
+
+    def _update(self, calendarId, eventId, body):
+        self.writes += 1
+        self.calendar[eventId]  # KeyError like a 404
+        self.calendar[eventId] = dict(body, id=eventId)
+        return self.calendar[eventId]
+
+    def _delete(self, calendarId, eventId):
+        self.writes += 1
+        del self.calendar[eventId]
+        return ''
@@ -0,0 +1,57 @@
+"""Generate 52 weeks for 200 caregivers and hold the one-second line.
+
+Times generate_schedule end to end (delete, load, engine, bulk insert)
+against a throwaway database, with the solver engine production runs
+unless --engine says otherwise. Fails if it takes longer than --budget
+seconds.
+
+    python -m benchmarks.generator_benchmark
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.support import add_time_off, app, reset_database
+from app.models import db, Caregiver, Shift
+from app.schedule_generator import generate_schedule
+
+START = date(2025, 1, 6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--caregivers', type=int, default=200)
+    parser.add_argument('--weeks', type=int, default=52)
+    parser.add_argument('--engine', default='solver', help='solver (the production default) or greedy')
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    reset_database()
+    with app.app_context():
+        db.session.bulk_insert_mappings(Caregiver, [{'name': f'CG{i}'} for i in range(args.caregivers)])
+        db.session.commit()
+        for caregiver in Caregiver.query.all():
+            for _ in range(3):
+                first = START + timedelta(days=rng.randrange(args.weeks * 7))
+                add_time_off(caregiver.id, first, first + timedelta(days=rng.randrange(10)))
+
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        generate_schedule(START, args.weeks, engine=args.engine)
+        cpu = time.process_time() - cpu_started
+        elapsed = time.perf_counter() - started
+        shifts = Shift.query.count()
+
+    print(f'{args.weeks} weeks, {args.caregivers} caregivers, {args.engine}: '
+          f'{shifts} shifts in {elapsed * 1000:.0f} ms ({cpu * 1000:.0f} ms cpu)')
+    if elapsed > args.budget:
+        print(f'FAIL: over the {args.budget:.1f}s budget')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Import time and resident memory of a web worker with and without the Google client stack.
+
+Each scenario runs in a fresh interpreter, as a gunicorn worker would:
+
+- lazy: import wsgi and serve / (what a worker does now)
+- eager: import the Google client stack first, as routes.py used to
+- first sync: lazy, then build a Calendar service from the cached
+  discovery document (what the first calendar sync pays)
+
+    python -m benchmarks.google_import_benchmark
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.support import app, reset_database
+from app.cli import init_database
+
+RUNS = 5
+
+PROBE = r'''
+import json, resource, sys, time
+started = time.perf_counter()
+if {eager}:
+    import googleapiclient.discovery, googleapiclient.errors
+    import google_auth_oauthlib.flow, google.auth.transport.requests
+import wsgi
+wsgi.app.test_client().get('/')
+ready = time.perf_counter()
+service_ms = None
+if {build}:
+    from google.auth.credentials import AnonymousCredentials
+    from app.google_calendar import build_service
+    build_started = time.perf_counter()
+    build_service(AnonymousCredentials())
+    service_ms = (time.perf_counter() - build_started) * 1000
+print(json.dumps({{
+    'ready_ms': (ready - started) * 1000,
+    'service_ms': service_ms,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+}}))
+'''
+
+SCENARIOS = [
+    ('lazy', {'eager': False, 'build': False}),
+    ('eager', {'eager': True, 'build': False}),
+    ('first sync', {'eager': False, 'build': True}),
+]
+
+
+def probe(eager, build):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    output = subprocess.run([sys.executable, '-c', PROBE.format(eager=eager, build=build)], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        init_database()
+
+    for label, options in SCENARIOS:
+        results = [probe(**options) for _ in range(RUNS)]
+        ready = statistics.median(r['ready_ms'] for r in results)
+        rss = statistics.median(r['rss_mb'] for r in results)
+        line = f'  {label:<11} ready {ready:7.1f} ms  rss {rss:6.1f} MB  {results[0]["modules"]:5d} modules'
+        if options['build']:
+            line += f'  service built in {statistics.median(r["service_ms"] for r in results):.1f} ms'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
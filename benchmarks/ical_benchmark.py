@@ -0,0 +1,83 @@
+"""iCalendar feeds: first render vs cache hit vs 304, and UID stability.
+
+A subscribed phone polls with If-None-Match or If-Modified-Since; both
+should come back 304 without touching the shift table. Regenerating the
+same schedule must leave every UID in place. After generate_schedule the
+house feed must hold an event for every shift, G1 and G2 included.
+
+    python -m benchmarks.ical_benchmark
+"""
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.support import app, count_queries, reset_database
+from app.cli import init_database
+from app.models import Shift
+from app.ical import feed_window
+from app.projection import materialize
+from app.schedule_generator import generate_schedule
+
+URLS = ['/ical/all.ics', '/ical/Kisha.ics']
+
+
+def get(client, url, **kwargs):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        response = client.get(url, **kwargs)
+        elapsed = time.perf_counter() - started
+    return response, elapsed * 1000, counter['queries']
+
+
+def uids(body):
+    return set(re.findall(r'^UID:(.+?)\r$', body, re.M))
+
+
+def main():
+    reset_database()
+    start, end = feed_window()
+    with app.app_context():
+        init_database()
+        materialize(start, end)
+
+    client = app.test_client()
+    failed = False
+    with app.app_context():
+        for url in URLS:
+            miss, miss_ms, miss_q = get(client, url)
+            hit, hit_ms, hit_q = get(client, url)
+            _, etag_ms, etag_q = get(client, url, headers={'If-None-Match': hit.headers['ETag']})
+            since, since_ms, since_q = get(client, url, headers={'If-Modified-Since': hit.headers['Last-Modified']})
+            events = miss.get_data(as_text=True).count('BEGIN:VEVENT')
+            print(f'  {url:<18} {events:>4} events  miss {miss_ms:6.1f} ms ({miss_q} q)  '
+                  f'hit {hit_ms:5.2f} ms ({hit_q} q)  304 etag {etag_ms:5.2f} ms ({etag_q} q)  '
+                  f'304 since {since_ms:5.2f} ms ({since_q} q)')
+            failed |= since.status_code != 304
+
+        before = uids(client.get(URLS[0]).get_data(as_text=True))
+        # The write stamp is whole seconds; make sure the regeneration lands after it
+        time.sleep(1.1)
+        old = client.get(URLS[0]).headers['Last-Modified']
+        materialize(start, end)
+        after = client.get(URLS[0], headers={'If-Modified-Since': old})
+
+        today = datetime.now().date()
+        generate_schedule(today - timedelta(days=today.weekday()))
+        generated = client.get(URLS[0])
+        shifts = Shift.query.filter(Shift.date >= start, Shift.date <= end).count()
+    print(f'  after regenerating: {after.status_code}, '
+          f'{len(before & uids(after.get_data(as_text=True)))}/{len(before)} UIDs kept')
+    generated_events = generated.get_data(as_text=True).count('BEGIN:VEVENT')
+    print(f'  after generate_schedule: {generated.status_code}, {generated_events}/{shifts} shifts as events')
+    if failed or after.status_code != 200 or uids(after.get_data(as_text=True)) != before:
+        print('FAIL')
+        sys.exit(1)
+    if generated.status_code != 200 or generated_events != shifts:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Query plans and latency of the hot shift/time_off lookups, with and without indexes.
+
+Builds five years of shifts for 100 caregivers. Runs on SQLite by default;
+set BENCHMARK_DATABASE_URL to a scratch Postgres database to benchmark that
+instead (the tables in it are dropped and recreated). DATABASE_URL is
+ignored so a deployed database is never touched.
+
+    python -m benchmarks.index_benchmark
+    BENCHMARK_DATABASE_URL=postgresql://... python -m benchmarks.index_benchmark
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.support import app, reset_database
+from app.models import db, Caregiver, Shift, TimeOff
+from app.schedule_generator import DAILY_DEMAND
+
+START = date(2021, 1, 4)
+NUM_DAYS = 5 * 365
+NUM_CAREGIVERS = 100
+REPEAT = 200
+
+INDEXES = {
+    'uq_shift_date_type_slot': 'CREATE UNIQUE INDEX uq_shift_date_type_slot ON shift (date, shift_type, slot)',
+    'ix_shift_caregiver_date': 'CREATE INDEX ix_shift_caregiver_date ON shift (caregiver_id, date)',
+    'ix_time_off_caregiver_range': 'CREATE INDEX ix_time_off_caregiver_range ON time_off (caregiver_id, start_date, end_date)',
+    'ix_time_off_range': 'CREATE INDEX ix_time_off_range ON time_off (start_date, end_date)',
+}
+
+# (label, SQL, params(rng) -> dict)
+QUERIES = [
+    ('shifts in a week',
+     'SELECT id, date, shift_type, caregiver_id FROM shift WHERE date >= :start AND date <= :end',
+     lambda rng: _week(rng)),
+    ('caregiver shifts in a week',
+     'SELECT COUNT(*) FROM shift WHERE caregiver_id = :cid AND date >= :start AND date <= :end',
+     lambda rng: dict(_week(rng), cid=rng.randint(1, NUM_CAREGIVERS))),
+    ('shift by date and type',
+     'SELECT id FROM shift WHERE date = :day AND shift_type = :shift_type',
+     lambda rng: {'day': _day(rng), 'shift_type': rng.choice('ABC')}),
+    ('caregiver time off overlap',
+     'SELECT id FROM time_off WHERE caregiver_id = :cid AND start_date <= :end AND end_date >= :start',
+     lambda rng: dict(_week(rng), cid=rng.randint(1, NUM_CAREGIVERS))),
+    ('time off overlap',
+     'SELECT id, caregiver_id FROM time_off WHERE start_date <= :end AND end_date >= :start',
+     lambda rng: _week(rng)),
+]
+
+
+def _day(rng):
+    return START + timedelta(days=rng.randrange(NUM_DAYS))
+
+
+def _week(rng):
+    start = _day(rng)
+    return {'start': start, 'end': start + timedelta(days=6)}
+
+
+def seed(rng):
+    db.session.bulk_insert_mappings(Caregiver, [{'name': f'CG{i}'} for i in range(NUM_CAREGIVERS)])
+    ids = [c.id for c in Caregiver.query.all()]
+    shifts = []
+    for offset in range(NUM_DAYS):
+        day = START + timedelta(days=offset)
+        for shift_type, count in DAILY_DEMAND:
+            if shift_type == 'B' and day.weekday() == 5:
+                continue
+            for slot in range(count):
+                shifts.append({'date': day, 'shift_type': shift_type, 'slot': slot,
+                               'caregiver_id': rng.choice(ids)})
+    time_off = []
+    for cid in ids:
+        for _ in range(50):
+            first = _day(rng)
+            time_off.append({'caregiver_id': cid, 'start_date': first,
+                             'end_date': first + timedelta(days=rng.randrange(7)),
+                             'status': 'approved', 'category': 'vacation'})
+    db.session.bulk_insert_mappings(Shift, shifts)
+    db.session.bulk_insert_mappings(TimeOff, time_off)
+    db.session.commit()
+    return len(shifts), len(time_off)
+
+
+def explain(sql, params):
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql), params).fetchall()
+        return '; '.join(row[-1] for row in rows)
+    rows = db.session.execute(text('EXPLAIN ' + sql), params).fetchall()
+    return rows[0][0].strip()
+
+
+def measure(label):
+    rng = random.Random(1)
+    print(f'\n{label}')
+    for name, sql, make_params in QUERIES:
+        params = [make_params(rng) for _ in range(REPEAT)]
+        plan = explain(sql, params[0])
+        started = time.perf_counter()
+        for p in params:
+            db.session.execute(text(sql), p).fetchall()
+        elapsed = (time.perf_counter() - started) / REPEAT
+        print(f'  {name:<28} {elapsed * 1000:7.3f} ms  {plan}')
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        num_shifts, num_time_off = seed(random.Random(0))
+        print(f'{db.engine.dialect.name}: {num_shifts} shifts, {num_time_off} time off records, '
+              f'{NUM_CAREGIVERS} caregivers')
+
+        for name in INDEXES:
+            db.session.execute(text(f'DROP INDEX {name}'))
+        db.session.commit()
+        measure('without indexes')
+
+        for statement in INDEXES.values():
+            db.session.execute(text(statement))
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        measure('with indexes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Instrumentation: per-view report from /metrics and the cost of the SQL listeners.
+
+Drives the calendar, printable and caregiver views, prints what the
+aggregates say about each, then times a run of small queries with the
+engine listeners installed and removed.
+
+    python -m benchmarks.instrumentation_benchmark
+"""
+import time
+from datetime import date
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from benchmarks.support import app, reset_database
+from app import db, instrumentation
+from app.cache import get_cache
+from app.cli import init_database
+from app.projection import materialize
+
+START = date(2025, 4, 7)
+URLS = [
+    '/calendar?start=2025-04-07&end=2025-07-06',
+    '/printable-schedule?start=2025-04-07&end=2025-04-20',
+    '/caregiver-schedule/Kisha?start=2025-04-07&end=2025-07-06',
+    '/api/schedule?start=2025-04-07&end=2025-07-06',
+]
+ROUNDS = 20
+QUERIES = 5000
+
+
+def time_queries():
+    with db.engine.connect() as conn:
+        started = time.perf_counter()
+        for _ in range(QUERIES):
+            conn.execute(text('SELECT 1')).scalar()
+        return (time.perf_counter() - started) / QUERIES * 1e6
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        init_database()
+        materialize(START, date(2025, 7, 6))
+
+    instrumentation.metrics.reset()
+    client = app.test_client()
+    for _ in range(ROUNDS):
+        # Empty the view cache so every round renders
+        with app.app_context():
+            get_cache().clear()
+        for url in URLS:
+            client.get(url).close()
+
+    metrics = instrumentation.metrics
+    print(f'  {"endpoint":<28} {"requests":>8} {"mean ms":>8} {"queries":>8} {"db ms":>7}')
+    for endpoint, histogram in sorted(metrics.durations.items()):
+        count = histogram[-1]
+        print(f'  {endpoint:<28} {count:>8} {histogram[-2] / count * 1000:8.2f} '
+              f'{metrics.queries[endpoint] / count:8.1f} {metrics.db_time[endpoint] / count * 1000:7.2f}')
+
+    with app.app_context():
+        with_listeners = time_queries()
+        event.remove(Engine, 'before_cursor_execute', instrumentation._before_cursor_execute)
+        event.remove(Engine, 'after_cursor_execute', instrumentation._after_cursor_execute)
+        without = time_queries()
+    print(f'  SELECT 1: {without:.1f} us bare, {with_listeners:.1f} us instrumented '
+          f'(+{with_listeners - without:.1f} us per query)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""CPU spent on logging: the old global DEBUG setup vs the default config.
+
+Runs a month-wide /fill-schedule (request plus job) and a month of the
+calendar and caregiver views twice: once with the root at DEBUG and
+SQLAlchemy inheriting it, which is what basicConfig(level=DEBUG) used to
+do, and once with the defaults. Output goes to a counting sink, so this
+measures formatting and not terminal speed.
+
+    python -m benchmarks.logging_benchmark
+"""
+import sys
+import time
+from datetime import date
+
+from benchmarks.support import app, reset_database
+from app.cache import get_cache
+from app.cli import init_database
+from app.jobs import claim_next, run_job
+from app.logging_config import configure_logging
+
+START = date(2025, 4, 7)
+END = date(2025, 5, 4)
+ROUNDS = 10
+CONFIGS = [
+    ('old: root DEBUG', {'LOG_LEVEL': 'DEBUG', 'LOG_LEVELS': 'sqlalchemy=NOTSET'}),
+    ('default', {}),
+]
+
+
+class CountingSink:
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, text):
+        self.lines += text.count('\n')
+
+    def flush(self):
+        pass
+
+
+def workload(client):
+    response = client.post('/fill-schedule', json={'start': str(START), 'end': str(END)})
+    assert response.status_code == 202, response.get_data(as_text=True)
+    job = run_job(claim_next('benchmark'))
+    assert job.status == 'succeeded', job.error
+    get_cache().clear()
+    for url in (f'/calendar?start={START}&end={END}', f'/caregiver-schedule/Kisha?start={START}&end={END}'):
+        assert client.get(url).status_code == 200, url
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        init_database()
+
+    client = app.test_client()
+    cpu = {}
+    with app.app_context():
+        workload(client)  # warm up
+        for label, environ in CONFIGS:
+            sink = CountingSink()
+            configure_logging(environ, stream=sink)
+            started = time.process_time()
+            for _ in range(ROUNDS):
+                workload(client)
+            cpu[label] = (time.process_time() - started) / ROUNDS * 1000
+            print(f'  {label:<16} {cpu[label]:7.1f} ms cpu per round  {sink.lines / ROUNDS:6.0f} log lines')
+    configure_logging()
+
+    saved = cpu['old: root DEBUG'] - cpu['default']
+    print(f'  saved {saved:.1f} ms cpu per round ({saved / cpu["old: root DEBUG"]:.0%})')
+    if saved <= 0:
+        print('FAIL: the default config is not cheaper')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Check that /printable-schedule renders with a constant number of queries.
+
+Renders two weeks of the seeded range against a small and a large
+synthetic dataset and fails if the query count grows with caregivers,
+shifts or time off records. The view cache is emptied first so the render
+itself is measured.
+
+    python -m benchmarks.printable_benchmark
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.support import add_time_off, app, count_queries, reset_database, seed_pattern
+from app.cache import get_cache
+from app.utils import CAREGIVER_ORDER
+
+START = date(2025, 4, 7)
+
+
+def render(extra_caregivers, time_off_records):
+    reset_database()
+    with app.app_context():
+        names = CAREGIVER_ORDER + [f'Extra{i}' for i in range(extra_caregivers)]
+        ids = seed_pattern(names, START, 28)
+        for i in range(time_off_records):
+            name = names[i % len(names)]
+            day = START + timedelta(days=i % 14)
+            add_time_off(ids[name], day, day)
+
+        client = app.test_client()
+        get_cache().clear()
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = client.get(f'/printable-schedule?start={START}&end={START + timedelta(days=13)}')
+            elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.status_code
+    return counter['queries'], elapsed
+
+
+def main():
+    small = render(extra_caregivers=0, time_off_records=2)
+    large = render(extra_caregivers=40, time_off_records=60)
+    print(f'small dataset: {small[0]} queries, {small[1] * 1000:.1f} ms')
+    print(f'large dataset: {large[0]} queries, {large[1] * 1000:.1f} ms')
+    if small[0] != large[0]:
+        print('FAIL: query count grows with the data')
+        sys.exit(1)
+    print('OK: constant query count')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Project the weekly template over a year, then extend the window by a month.
+
+    python -m benchmarks.projection_benchmark
+"""
+import time
+from datetime import date, timedelta
+
+from benchmarks.support import app, count_queries, reset_database
+from app.projection import PatternProjection, materialize
+from app.template_store import import_config_template
+
+START = date(2025, 1, 6)
+END = START + timedelta(days=364)
+
+
+def timed(label, func):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+    print(f'  {label:<28} {elapsed * 1000:7.2f} ms  {counter["queries"]:3d} statements')
+    return result
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        import_config_template()
+        projection = PatternProjection.from_db(START, END)
+
+        count = timed('project a year (generator)', lambda: sum(1 for _ in projection.shifts(START, END)))
+        print(f'  -> {count} shifts')
+        timed('materialize a year', lambda: materialize(START, END))
+        counts = timed('extend by a month', lambda: materialize(START, END + timedelta(days=30), extend=True))
+        print(f'  -> {counts["inserted"]} shifts from {counts["start"]}')
+
+
+if __name__ == '__main__':
+    main()
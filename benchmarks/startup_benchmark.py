@@ -0,0 +1,63 @@
+"""Cold start: import wsgi to first response, in fresh interpreters.
+
+Each run starts a new Python process (as a gunicorn worker would), times
+`import wsgi` and the first request to / and /calendar, and reports
+whether the Google client stack got imported along the way. The
+database is initialized once beforehand, outside the timings.
+
+    python -m benchmarks.startup_benchmark
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.support import app, reset_database
+from app.cli import init_database
+
+RUNS = 5
+
+PROBE = r'''
+import json, sys, time
+started = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+client = wsgi.app.test_client()
+index = client.get('/')
+first = time.perf_counter()
+calendar = client.get('/calendar')
+done = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'first_response': first - started,
+    'calendar': done - first,
+    'status': [index.status_code, calendar.status_code],
+    'googleapiclient': 'googleapiclient' in sys.modules,
+}))
+'''
+
+
+def probe():
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        init_database()
+
+    results = [probe() for _ in range(RUNS)]
+    for key in ('import', 'first_response', 'calendar'):
+        values = [r[key] * 1000 for r in results]
+        print(f'  {key:<16} median {statistics.median(values):7.1f} ms  '
+              f'(min {min(values):.1f}, max {max(values):.1f})')
+    print(f'  status codes     {results[0]["status"]}')
+    print(f'  googleapiclient imported: {results[0]["googleapiclient"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""Benchmark suite: the hot paths on synthetic data, with a JSON baseline.
+
+Builds N caregivers x M weeks x a time-off density in a temp SQLite
+database and runs each case: the read paths through the Flask test client
+(view cache emptied first, so every run renders), then the write paths.
+Records the best wall time of the repeats (the least noisy figure), the
+SQL statements and the peak traced memory.
+
+    python -m benchmarks.suite                                  # print results
+    python -m benchmarks.suite --save benchmarks/baseline.json  # record a baseline
+    python -m benchmarks.suite --compare benchmarks/baseline.json --tolerance 0.5
+
+Compare mode exits 1 when a case is slower or uses more memory than the
+baseline by more than the tolerance, or issues more statements at all.
+Timings only compare on the same machine; record the baseline where you
+compare. Statement counts are exact and the surest signal; timings on a
+busy machine swing by a third, hence the loose default tolerance.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from benchmarks.fake_calendar import FakeCalendarService
+from benchmarks.support import app, count_queries, make_dataset, reset_database
+from app.availability import AvailabilityIndex
+from app.cache import get_cache
+from app.jobs import claim_next, run_job
+from app.models import Caregiver, Shift
+from app.schedule_generator import generate_schedule
+from app.utils import get_shift
+
+START = date(2025, 1, 6)
+
+
+class Case:
+    """A named hot path: setup() once, then run() timed repeatedly"""
+
+    def __init__(self, params):
+        self.params = params
+        self.start = START
+        self.end = START + timedelta(weeks=params['weeks'], days=-1)
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+
+class ViewCase(Case):
+    """GET a URL with the view cache emptied, so the view renders every time"""
+    url = None
+
+    def setup(self):
+        self.client = app.test_client()
+
+    def path(self):
+        return self.url.format(start=self.start, end=self.end, two_weeks=self.start + timedelta(days=13))
+
+    def run(self):
+        get_cache().clear()
+        response = self.client.get(self.path())
+        assert response.status_code == 200, f'{self.path()} returned {response.status_code}'
+        response.get_data()
+        response.close()
+
+
+class CalendarView(ViewCase):
+    name = 'calendar_view'
+    url = '/calendar?start={start}&end={end}'
+
+
+class PrintableSchedule(ViewCase):
+    name = 'printable_schedule'
+    url = '/printable-schedule?start={start}&end={two_weeks}'
+
+
+class CaregiverSchedule(ViewCase):
+    name = 'caregiver_schedule'
+    url = '/caregiver-schedule/Kisha?start={start}&end={end}'
+
+
+class ScheduleApi(ViewCase):
+    name = 'api_schedule'
+    url = '/api/schedule?start={start}&end={end}&weeks=12'
+
+
+class IcalFeed(ViewCase):
+    name = 'ical_feed'
+    url = '/ical/all.ics?start={start}&end={end}'
+
+
+class ExcelExport(ViewCase):
+    name = 'excel_export'
+    url = '/printable-schedule?start={start}&end={end}&format=excel'
+
+
+class GetShift(Case):
+    """utils.get_shift for every caregiver and day of two weeks"""
+    name = 'get_shift'
+
+    def setup(self):
+        end = self.start + timedelta(days=13)
+        self.shifts = Shift.query.filter(Shift.date >= self.start, Shift.date <= end).all()
+        for shift in self.shifts:
+            shift.caregiver
+        self.names = [name for (name,) in Caregiver.query.with_entities(Caregiver.name)]
+        self.dates = [self.start + timedelta(days=i) for i in range(14)]
+        self.availability = AvailabilityIndex.build(self.start, end)
+
+    def run(self):
+        for date in self.dates:
+            for name in self.names:
+                get_shift(self.shifts, date, name, self.availability)
+
+
+class CalendarSync(Case):
+    """sync_shifts_to_calendar against a fake service that already holds the events"""
+    name = 'calendar_sync'
+
+    def setup(self):
+        from app.google_calendar import sync_shifts_to_calendar
+        self.sync = sync_shifts_to_calendar
+        self.service = FakeCalendarService()
+        self.run()
+
+    def shifts(self):
+        return Shift.query.filter(Shift.date >= self.start, Shift.date <= self.end).order_by(Shift.date).all()
+
+    def run(self):
+        self.sync(self.shifts(), service=self.service, start_date=self.start, end_date=self.end)
+
+
+class GenerateSchedule(Case):
+    name = 'generate_schedule'
+
+    def run(self):
+        generate_schedule(self.start, self.params['weeks'])
+
+
+class FillSchedule(Case):
+    """POST /fill-schedule and run the queued job, as the worker would"""
+    name = 'fill_schedule'
+
+    def setup(self):
+        self.client = app.test_client()
+
+    def run(self):
+        response = self.client.post('/fill-schedule', json={'start': str(self.start), 'end': str(self.end)})
+        assert response.status_code == 202, response.get_data(as_text=True)
+        job = run_job(claim_next('benchmark'))
+        assert job.status == 'succeeded', job.error
+
+
+# Read paths first: the write paths replace the shifts they run over
+CASES = [CalendarView, PrintableSchedule, CaregiverSchedule, ScheduleApi, IcalFeed, ExcelExport,
+         GetShift, CalendarSync, GenerateSchedule, FillSchedule]
+
+
+def measure(case, repeat):
+    case.setup()
+    case.run()  # warm up
+    times = []
+    # Keep collector pauses out of the timings, as timeit does
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            with count_queries() as counter:
+                started = time.perf_counter()
+                case.run()
+                times.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    tracemalloc.start()
+    case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ms': round(min(times) * 1000, 3),
+        'queries': counter['queries'],
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_suite(params, only=None):
+    reset_database()
+    results = {}
+    with app.app_context():
+        make_dataset(params['caregivers'], params['weeks'], params['time_off'], START, seed=params['seed'])
+        for case_class in CASES:
+            if only and case_class.name not in only:
+                continue
+            results[case_class.name] = measure(case_class(params), params['repeat'])
+            result = results[case_class.name]
+            print(f'  {case_class.name:<20} {result["ms"]:9.2f} ms  {result["queries"]:5} q  '
+                  f'{result["peak_kb"]:9.1f} KB', flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """Print each case against the baseline; returns the names of the regressions"""
+    regressions = []
+    print(f'\n  {"case":<20} {"ms":>19} {"queries":>13} {"peak KB":>23}')
+    for name, now in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f'  {name:<20} (not in baseline)')
+            continue
+        slower = (now['ms'] > before['ms'] * (1 + tolerance) and
+                  now['ms'] - before['ms'] > min_ms)
+        more_queries = now['queries'] > before['queries']
+        more_memory = now['peak_kb'] > before['peak_kb'] * (1 + tolerance)
+        flags = [label for label, hit in (('time', slower), ('queries', more_queries), ('memory', more_memory)) if hit]
+        if flags:
+            regressions.append(name)
+        print(f'  {name:<20} {before["ms"]:8.2f} -> {now["ms"]:8.2f}  {before["queries"]:5} -> {now["queries"]:5}  '
+              f'{before["peak_kb"]:9.1f} -> {now["peak_kb"]:9.1f}  {"REGRESSED: " + ", ".join(flags) if flags else "ok"}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--caregivers', type=int, default=50)
+    parser.add_argument('--weeks', type=int, default=12)
+    parser.add_argument('--time-off', type=float, default=0.05, help='share of caregiver-days off')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=7, help='timed runs per case; the best is kept')
+    parser.add_argument('--only', nargs='+', metavar='CASE', choices=[c.name for c in CASES],
+                        help=', '.join(c.name for c in CASES))
+    parser.add_argument('--save', metavar='JSON', help='write the results as a baseline')
+    parser.add_argument('--compare', metavar='JSON', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative slowdown / memory growth')
+    parser.add_argument('--min-ms', type=float, default=2.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    baseline = None
+    params = {'caregivers': args.caregivers, 'weeks': args.weeks, 'time_off': args.time_off,
+              'seed': args.seed, 'repeat': args.repeat}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Compare like with like: take the data shape from the baseline
+        params.update(baseline['params'])
+        params['repeat'] = args.repeat
+
+    print(f'{params["caregivers"]} caregivers x {params["weeks"]} weeks, '
+          f'{params["time_off"]:.0%} time off, best of {params["repeat"]}')
+    results = run_suite(params, args.only)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'params': {key: params[key] for key in ('caregivers', 'weeks', 'time_off', 'seed')},
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+        print(f'Saved baseline to {args.save}')
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        if regressions:
+            print(f'FAIL: {len(regressions)} regression(s) beyond {args.tolerance:.0%}: {", ".join(regressions)}')
+            sys.exit(1)
+        print('OK: no regressions')
+
+
+if __name__ == '__main__':
+    main()
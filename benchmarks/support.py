@@ -0,0 +1,108 @@
+"""Shared helpers for the benchmark scripts: a throwaway database, synthetic data and query counting."""
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+# reset_database() drops every table, so never run against DATABASE_URL: use
+# BENCHMARK_DATABASE_URL when given (e.g. a scratch Postgres), else a temp file
+os.environ['DATABASE_URL'] = os.environ.get('BENCHMARK_DATABASE_URL') or \
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'ghs_benchmark.db')
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.cache import get_cache
+from app.config import ShiftConfig
+from app.models import Caregiver, Shift, TimeOff
+
+app = create_app()
+
+
+def reset_database():
+    """Drop and recreate every table in the benchmark database and empty the view cache.
+
+    The schedule version starts again from 0 in the new tables, so pages
+    cached for the old data would otherwise be served for the new.
+    """
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        get_cache().clear()
+
+
+def seed_pattern(caregiver_names, start_date, num_days, pattern=None):
+    """Create caregivers and fill num_days from the weekly pattern; returns name -> id"""
+    pattern = pattern or ShiftConfig.WEEKLY_PATTERN
+    caregivers = [Caregiver(name=name) for name in caregiver_names]
+    db.session.add_all(caregivers)
+    db.session.flush()
+    ids = {c.name: c.id for c in caregivers}
+    rows = []
+    for offset in range(num_days):
+        date = start_date + timedelta(days=offset)
+        for shift_type, name in pattern.get(date.weekday(), {}).items():
+            if name in ids:
+                rows.append({'date': date, 'shift_type': shift_type, 'caregiver_id': ids[name]})
+    db.session.bulk_insert_mappings(Shift, rows)
+    db.session.commit()
+    return ids
+
+
+def add_time_off(caregiver_id, start_date, end_date, status='approved'):
+    db.session.add(TimeOff(caregiver_id=caregiver_id, start_date=start_date,
+                           end_date=end_date, status=status))
+    db.session.commit()
+
+
+def make_dataset(caregivers, weeks, time_off_density, start_date, seed=0):
+    """Seed the database with caregivers, approved time off and projected shifts.
+
+    The named caregivers from the weekly template come first, then extras
+    up to `caregivers`. time_off_density is the share of each caregiver's
+    days taken off, in blocks of one to seven days. Shifts are the weekly
+    template projected over the weeks, around the time off. Returns the
+    (start, end) of the data.
+    """
+    from app.cli import init_database
+    from app.projection import materialize
+
+    rng = random.Random(seed)
+    end_date = start_date + timedelta(weeks=weeks, days=-1)
+    init_database()
+    extra = caregivers - Caregiver.query.count()
+    if extra > 0:
+        db.session.bulk_insert_mappings(Caregiver, [{'name': f'Extra{i}'} for i in range(extra)])
+
+    days = weeks * 7
+    rows = []
+    for (caregiver_id,) in db.session.query(Caregiver.id):
+        taken = 0
+        while taken < time_off_density * days:
+            length = rng.randint(1, 7)
+            first = start_date + timedelta(days=rng.randrange(days))
+            rows.append({'caregiver_id': caregiver_id, 'start_date': first,
+                         'end_date': first + timedelta(days=length - 1), 'status': 'approved'})
+            taken += length
+    db.session.bulk_insert_mappings(TimeOff, rows)
+    db.session.commit()
+
+    materialize(start_date, end_date)
+    return start_date, end_date
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements sent to the engine inside the block"""
+    counter = {'queries': 0}
+
+    def before_cursor_execute(*args):
+        counter['queries'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
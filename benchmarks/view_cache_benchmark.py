@@ -0,0 +1,59 @@
+"""Schedule views: first render vs cache hit vs 304, and invalidation on write.
+
+    python -m benchmarks.view_cache_benchmark
+"""
+import sys
+import time
+from datetime import date
+
+from benchmarks.support import app, count_queries, reset_database
+from app.cli import init_database
+from app.models import Caregiver
+from app.projection import materialize
+
+START = date(2025, 4, 7)
+URLS = [
+    '/calendar?start=2025-04-07&end=2025-07-06',
+    '/printable-schedule?start=2025-04-07&end=2025-04-20',
+    '/hourly',
+    '/grant',
+]
+
+
+def get(client, url, **kwargs):
+    with count_queries() as counter:
+        started = time.perf_counter()
+        response = client.get(url, **kwargs)
+        elapsed = time.perf_counter() - started
+    return response, elapsed * 1000, counter['queries']
+
+
+def main():
+    reset_database()
+    with app.app_context():
+        init_database()
+        materialize(START, date(2025, 7, 6))
+        caregiver_id = Caregiver.query.filter_by(name='Kisha').first().id
+
+    client = app.test_client()
+    with app.app_context():
+        for url in URLS:
+            miss, miss_ms, miss_q = get(client, url)
+            hit, hit_ms, hit_q = get(client, url)
+            _, not_modified_ms, _ = get(client, url, headers={'If-None-Match': hit.headers['ETag']})
+            print(f'  {url.split("?")[0]:<20} miss {miss_ms:6.1f} ms ({miss_q} q)  '
+                  f'hit {hit_ms:5.2f} ms ({hit_q} q)  304 {not_modified_ms:5.2f} ms')
+
+        url = URLS[0]
+        etag = client.get(url).headers['ETag']
+        client.post('/add_shift', data={'caregiver_id': caregiver_id, 'shift_type': 'G2', 'date': '2025-04-08'})
+        after = client.get(url, headers={'If-None-Match': etag})
+    print(f'  after add_shift: {after.status_code} (new ETag: {after.headers["ETag"] != etag})')
+    if after.status_code != 200 or after.headers['ETag'] == etag:
+        print('FAIL: a write did not invalidate the cached page')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""Add shift.slot, the shift/time_off indexes and the unique slot constraint.
+
+Same as `flask migrate`; kept so existing deploy scripts keep working.
+Safe to run more than once; works on SQLite and Postgres.
+"""
+from app import create_app
+from app.cli import upgrade_schema
+import logging
+
+logger = logging.getLogger('app')
+
+app = create_app()
+with app.app_context():
+    upgrade_schema()
+    logger.info("Migration completed successfully")
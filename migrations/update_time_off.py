@@ -1,7 +1,6 @@
 from app import create_app, db
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger('app')
 
 app = create_app()
@@ -14,6 +14,7 @@ setup(
         'python-dotenv==1.0.0',
         'google-api-python-client==2.86.0',
         'google-auth-httplib2==0.1.0',
-        'google-auth-oauthlib==1.0.0'
+        'google-auth-oauthlib==1.0.0',
+        'XlsxWriter==3.2.9'
     ],
 ) 
\ No newline at end of file
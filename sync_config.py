@@ -5,6 +5,6 @@ app = create_app()
 
 with app.app_context():
     if ensure_sync():
-        print("Successfully synced database and config files")
+        print("Successfully synced weekly template to schedule")
     else:
-        print("Failed to sync database and config files") 
\ No newline at end of file
+        print("Failed to sync weekly template to schedule") 
\ No newline at end of file
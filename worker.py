@@ -0,0 +1,9 @@
+import os
+from app import create_app
+from app.jobs import work
+
+# create_app configures logging from LOG_LEVEL / LOG_LEVELS / LOG_FORMAT
+app = create_app()
+
+if __name__ == '__main__':
+    work(app, poll_interval=float(os.environ.get('WORKER_POLL_INTERVAL', '1.0')))